@@ -0,0 +1,147 @@
+"""
+Non-interactive degrees queries, answered as JSON lines.
+
+Batch queries are read one per line as two tab-separated people, each
+given as an IMDB person id or an unambiguous name. Queries are grouped
+by source: a source asked about several targets gets one single-source
+BFS, a lone pair gets a bidirectional search. Groups are spread over a
+process pool; forked workers share the already loaded (memory-mapped)
+graph, while spawned workers load it again from the binary cache.
+"""
+import json
+from collections import defaultdict
+
+import search
+from graph import MovieGraph
+from processes import fork_pool
+
+# Graph used by worker processes, inherited on fork or loaded on spawn
+shared_graph = None
+
+
+def read_queries(lines):
+    """
+    Yields (line number, source, target) for each query line.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            yield number, line, None
+        else:
+            yield number, fields[0].strip(), fields[1].strip()
+
+
+def resolve(graph, text):
+    """
+    Returns the index of the person given by an IMDB id or name, or an
+    error message if there is no such person or the name is ambiguous.
+    """
+    person = graph.person_index(text)
+    if person is not None:
+        return person, None
+    people = graph.people_named(text.lower())
+    if len(people) == 1:
+        return people[0], None
+    if not people:
+        return None, f"person not found: {text}"
+    return None, f"ambiguous name: {text}"
+
+
+def plan(graph, queries):
+    """
+    Splits queries into per-source tasks.
+    Returns the list of tasks and the results of unresolvable queries.
+    """
+    groups = defaultdict(list)
+    errors = []
+    for number, source_text, target_text in queries:
+        result = {"line": number, "source": source_text,
+                  "target": target_text}
+        if target_text is None:
+            errors.append(dict(result, error="expected two people"))
+            continue
+        source, error = resolve(graph, source_text)
+        if error is None:
+            target, error = resolve(graph, target_text)
+        if error is not None:
+            errors.append(dict(result, error=error))
+            continue
+        groups[source].append((result, target))
+    return list(groups.items()), errors
+
+
+def answer_group(task):
+    """
+    Answers every query of one source; runs inside a worker process.
+    """
+    graph = shared_graph
+    source, queries = task
+    if len(queries) == 1:
+        (result, target), = queries
+        paths = [search.bidirectional(graph, source, target)]
+    else:
+        tree = search.single_source(graph, source)
+        paths = [tree.path(target) for _, target in queries]
+
+    results = []
+    for (result, _), path in zip(queries, paths):
+        if path is None:
+            results.append(dict(result, degrees=None, path=None))
+        else:
+            results.append(dict(result, degrees=len(path), path=[
+                [graph.movie_ids[movie], graph.person_ids[person]]
+                for movie, person in path
+            ]))
+    return results
+
+
+def init_worker(directory):
+    global shared_graph
+    if shared_graph is None:
+        shared_graph = MovieGraph()
+        shared_graph.load(directory)
+
+
+def run_batch(graph, directory, lines, out, workers=None):
+    """
+    Answers the queries in `lines`, writing one JSON object per query to
+    `out` as soon as its source group is done.
+    """
+    global shared_graph
+    shared_graph = graph
+    tasks, errors = plan(graph, read_queries(lines))
+    for result in errors:
+        write(out, result)
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            for result in answer_group(task):
+                write(out, result)
+        return
+
+    with fork_pool(workers, init_worker, (directory,)) as pool:
+        for results in pool.imap_unordered(answer_group, tasks):
+            for result in results:
+                write(out, result)
+
+
+def run_single_source(graph, source, out):
+    """
+    Writes the degrees of separation from person index `source` to every
+    person connected to them, one JSON object per person.
+    """
+    tree = search.single_source(graph, source)
+    for person, distance in tree.reachable():
+        write(out, {
+            "person_id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "degrees": distance
+        })
+
+
+def write(out, result):
+    out.write(json.dumps(result) + "\n")
@@ -0,0 +1,313 @@
+"""
+Benchmarks for the degrees project.
+
+Usage: python benchmark.py search [directory] [--pairs N] [--costars]
+       python benchmark.py frontier [--sizes N ...]
+       python benchmark.py landmarks [directory] [-k K] [--pairs N]
+       python benchmark.py names [directory] [--queries N]
+       python benchmark.py load [directory]
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import landmarks
+import search
+from graph import CACHE_FILE, MovieGraph
+from nameindex import NameIndex
+from processes import peak_memory
+from util import (Node, StackFrontier, QueueFrontier, DequeStackFrontier,
+                  DequeQueueFrontier, PriorityFrontier)
+
+
+def load_graph(directory, costars=False):
+    graph = MovieGraph()
+    start = time.perf_counter()
+    graph.load(directory, costars)
+    print(f"Loaded {directory} in {time.perf_counter() - start:.3f}s "
+          f"({len(graph.person_ids)} people, {len(graph.movie_ids)} movies)")
+    return graph
+
+
+def random_pairs(graph, n, seed):
+    """
+    Returns `n` random (source, target) pairs of people with at least
+    one movie.
+    """
+    rng = random.Random(seed)
+    offsets = graph.person_offsets
+    actors = [person for person in range(len(graph.person_ids))
+              if offsets[person + 1] > offsets[person]]
+    return [(rng.choice(actors), rng.choice(actors)) for _ in range(n)]
+
+
+def bench_search(args):
+    graph = load_graph(args.directory, args.costars)
+    pairs = random_pairs(graph, args.pairs, args.seed)
+    engines = [
+        ("breadth-first", search.breadth_first),
+        ("bidirectional", search.bidirectional),
+    ]
+    lengths = {}
+    print(f"{'engine':<16}{'explored/query':>16}{'ms/query':>12}")
+    for name, engine in engines:
+        explored = 0
+        elapsed = 0
+        stats = {}
+        for source, target in pairs:
+            start = time.perf_counter()
+            path = engine(graph, source, target, stats)
+            elapsed += time.perf_counter() - start
+            explored += stats["explored"]
+            length = None if path is None else len(path)
+            if lengths.setdefault((source, target), length) != length:
+                raise RuntimeError(
+                    f"{name} disagrees on path length for {source}, {target}"
+                )
+        print(f"{name:<16}{explored / len(pairs):>16.1f}"
+              f"{elapsed / len(pairs) * 1000:>12.3f}")
+
+    cache = graph.neighbor_cache
+    if not graph.has_costars() and cache.hits + cache.misses:
+        print(f"Neighbor cache: {cache.hits} hits, {cache.misses} misses "
+              f"({cache.hits / (cache.hits + cache.misses):.1%} hit rate), "
+              f"{len(cache.entries)} entries, {cache.bytes} bytes")
+
+
+def bench_frontier(args):
+    frontiers = [
+        ("StackFrontier", StackFrontier, True),
+        ("QueueFrontier", QueueFrontier, True),
+        ("DequeStackFrontier", DequeStackFrontier, False),
+        ("DequeQueueFrontier", DequeQueueFrontier, False),
+        ("PriorityFrontier", PriorityFrontier, False),
+    ]
+    print(f"{'frontier':<20}{'nodes':>10}{'nodes/s':>14}")
+    for size in args.sizes:
+        nodes = [Node(state=i, parent=None, action=None) for i in range(size)]
+        for name, frontier_class, legacy in frontiers:
+            if legacy and size > args.legacy_max:
+                print(f"{name:<20}{size:>10}{'skipped':>14}")
+                continue
+
+            # Mimic BFS: a membership test before every add, then drain
+            start = time.perf_counter()
+            frontier = frontier_class()
+            for node in nodes:
+                if not frontier.contains_state(node.state):
+                    frontier.add(node)
+            while not frontier.empty():
+                frontier.remove()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<20}{size:>10}{size / elapsed:>14.0f}")
+
+
+def bench_landmarks(args):
+    graph = load_graph(args.directory)
+    start = time.perf_counter()
+    index = landmarks.LandmarkIndex.build(graph, args.k)
+    print(f"Built {args.k} landmarks in {time.perf_counter() - start:.3f}s")
+    pairs = random_pairs(graph, args.pairs, args.seed)
+
+    stats = {}
+    exact = {}
+    explored = 0
+    start = time.perf_counter()
+    for source, target in pairs:
+        path = search.bidirectional(graph, source, target, stats)
+        exact[source, target] = None if path is None else len(path)
+        explored += stats["explored"]
+    elapsed = time.perf_counter() - start
+    print(f"{'method':<16}{'explored/query':>16}{'ms/query':>12}")
+    print(f"{'bidirectional':<16}{explored / len(pairs):>16.1f}"
+          f"{elapsed / len(pairs) * 1000:>12.3f}")
+
+    answered = 0
+    explored = 0
+    start = time.perf_counter()
+    for source, target in pairs:
+        distance = index.distance(graph, source, target, stats)
+        if distance != exact[source, target]:
+            raise RuntimeError(f"oracle is wrong for {source}, {target}")
+        answered += stats["explored"] == 0
+        explored += stats["explored"]
+    elapsed = time.perf_counter() - start
+    print(f"{'landmarks':<16}{explored / len(pairs):>16.1f}"
+          f"{elapsed / len(pairs) * 1000:>12.3f}")
+
+    explored = 0
+    start = time.perf_counter()
+    for source, target in pairs:
+        path = index.shortest_path(graph, source, target, stats)
+        if (None if path is None else len(path)) != exact[source, target]:
+            raise RuntimeError(f"ALT search is wrong for {source}, {target}")
+        explored += stats["explored"]
+    elapsed = time.perf_counter() - start
+    print(f"{'ALT A*':<16}{explored / len(pairs):>16.1f}"
+          f"{elapsed / len(pairs) * 1000:>12.3f}")
+    print(f"{answered / len(pairs):.1%} of queries answered from bounds alone")
+
+
+def bench_names(args):
+    graph = load_graph(args.directory)
+    index = NameIndex(graph, args.directory)
+    start = time.perf_counter()
+    index.ensure_grams()
+    print(f"Trigram index ready in {time.perf_counter() - start:.3f}s "
+          f"({len(index.grams)} trigrams)")
+
+    rng = random.Random(args.seed)
+    people = [rng.randrange(len(graph.person_ids))
+              for _ in range(args.queries)]
+    names = [graph.person_names[person] for person in people]
+    prefixes = [name[:rng.randint(1, max(len(name), 1))] for name in names]
+    typos = []
+    for name in names:
+        i = rng.randrange(max(len(name), 1))
+        typos.append(name[:i] + rng.choice("aeiorstn") + name[i + 1:])
+
+    print(f"{'query':<10}{'ms/query':>12}{'hit rate':>12}")
+    for label, lookup, queries in [
+        ("exact", index.exact, names),
+        ("prefix", index.prefix, prefixes),
+        ("fuzzy", index.fuzzy, typos),
+    ]:
+        hits = 0
+        start = time.perf_counter()
+        for person, query in zip(people, queries):
+            results = lookup(query, limit=10)
+            hits += any(result["person_id"] == graph.person_ids[person]
+                        for result in results)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<10}{elapsed / len(queries) * 1000:>12.3f}"
+              f"{hits / len(queries):>12.1%}")
+
+
+def legacy_load(directory):
+    """
+    The original degrees.load_data: three DictReader passes into nested
+    dicts of string ids and sets.
+    """
+    names, people, movies = {}, {}, {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            if row["name"].lower() not in names:
+                names[row["name"].lower()] = {row["id"]}
+            else:
+                names[row["name"].lower()].add(row["id"])
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+def measure_load(loader, directory):
+    """
+    Runs one loader; called in a fresh process so peak memory is its own.
+    """
+    start = time.perf_counter()
+    if loader == "legacy":
+        legacy_load(directory)
+    elif loader == "build":
+        MovieGraph().build(directory)
+    else:
+        MovieGraph().load(directory)
+    return time.perf_counter() - start, peak_memory()
+
+
+def bench_load(args):
+    # Build into a scratch copy so the directory's own cache is untouched
+    with tempfile.TemporaryDirectory() as scratch:
+        for filename in ("people.csv", "movies.csv", "stars.csv"):
+            os.symlink(os.path.abspath(os.path.join(args.directory, filename)),
+                       os.path.join(scratch, filename))
+        context = multiprocessing.get_context("spawn")
+        print(f"{'loader':<22}{'seconds':>10}{'peak MiB':>12}")
+        for label, loader in [
+            ("DictReader (legacy)", "legacy"),
+            ("streaming build", "build"),
+            ("cold load + cache", "load"),
+            ("warm load (mmap)", "load"),
+        ]:
+            with context.Pool(1) as pool:
+                elapsed, peak = pool.apply(measure_load, (loader, scratch))
+            peak = "n/a" if peak is None else f"{peak / 2 ** 20:.1f}"
+            print(f"{label:<22}{elapsed:>10.3f}{peak:>12}")
+        assert os.path.exists(os.path.join(scratch, CACHE_FILE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "search", help="compare BFS engines on random pairs"
+    )
+    command.add_argument("directory", nargs="?", default="large")
+    command.add_argument("--pairs", type=int, default=100)
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--costars", action="store_true",
+                         help="precompute the co-star adjacency first")
+    command.set_defaults(run=bench_search)
+
+    command = commands.add_parser(
+        "frontier", help="measure frontier add/contains/remove throughput"
+    )
+    command.add_argument("--sizes", type=int, nargs="+",
+                         default=[10 ** 5, 10 ** 6])
+    command.add_argument("--legacy-max", type=int, default=10 ** 4,
+                         help="largest size to run the list frontiers at")
+    command.set_defaults(run=bench_frontier)
+
+    command = commands.add_parser(
+        "landmarks", help="compare the landmark oracle with bidirectional BFS"
+    )
+    command.add_argument("directory", nargs="?", default="large")
+    command.add_argument("-k", type=int, default=16)
+    command.add_argument("--pairs", type=int, default=1000)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_landmarks)
+
+    command = commands.add_parser(
+        "names", help="time exact, prefix and fuzzy name lookups"
+    )
+    command.add_argument("directory", nargs="?", default="large")
+    command.add_argument("--queries", type=int, default=1000)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_names)
+
+    command = commands.add_parser(
+        "load", help="compare CSV loading time and peak memory"
+    )
+    command.add_argument("directory", nargs="?", default="large")
+    command.set_defaults(run=bench_load)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
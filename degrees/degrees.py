@@ -1,66 +1,89 @@
-import csv
+import argparse
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import batch
+import search
+from graph import MovieGraph
+from nameindex import NameIndex
+
+# Integer-indexed movie graph, restored from its binary cache when possible
+graph = MovieGraph()
 
 # Maps names to a set of corresponding person_ids
-names = {}
+names = graph.names
+
+# Prefix and typo-tolerant search over people's names
+name_index = NameIndex(graph)
 
 # Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+people = graph.people
 
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+movies = graph.movies
 
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
+    A binary cache of the parsed graph is kept next to the CSV files and
+    memory-mapped on later runs until one of the CSV files changes.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    graph.load(directory)
+    name_index.attach(directory)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find degrees of separation between two actors."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="answer tab-separated pairs of people from FILE ('-' for "
+             "stdin), writing JSON lines instead of asking interactively"
+    )
+    parser.add_argument(
+        "--source", metavar="PERSON",
+        help="write the degrees from PERSON to everyone as JSON lines"
+    )
+    parser.add_argument(
+        "--find", metavar="NAME",
+        help="write the people best matching NAME as JSON lines"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="worker processes for --batch (default: one per CPU)"
+    )
+    args = parser.parse_args()
+    directory = args.directory
+    interactive = (args.batch is None and args.source is None
+                   and args.find is None)
 
     # Load data from files into memory
-    print("Loading data...")
+    log = sys.stdout if interactive else sys.stderr
+    print("Loading data...", file=log)
     load_data(directory)
-    print("Data loaded.")
+    print("Data loaded.", file=log)
+
+    if args.batch is not None:
+        if args.batch == "-":
+            batch.run_batch(graph, directory, sys.stdin, sys.stdout,
+                            args.workers)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                batch.run_batch(graph, directory, f, sys.stdout,
+                                args.workers)
+        return
+    if args.source is not None:
+        source, error = batch.resolve(graph, args.source)
+        if error is not None:
+            sys.exit(error)
+        batch.run_single_source(graph, source, sys.stdout)
+        return
+    if args.find is not None:
+        for candidate in name_index.search(args.find):
+            batch.write(sys.stdout, candidate)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -84,47 +107,29 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=True):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
-    """
-
-    # Initialize the frontier with the starting position
-    start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
-    frontier.add(start)
-
-    # Keep track of visited actors to prevent revisiting
-    explored = set()
-
-    while not frontier.empty():
-        node = frontier.remove()
-
-        # If this is the target, reconstruct the path
-        if node.state == target:
-            path = []
-            while node.parent is not None:
-                path.append((node.action, node.state))
-                node = node.parent
-            path.reverse()
-            return path
 
-        # Mark this node as explored
-        explored.add(node.state)
-
-        # Expand neighbors
-        for movie_id, person_id in neighbors_for_person(node.state):
-            if person_id not in explored and not frontier.contains_state(person_id):
-                child = Node(state=person_id, parent=node, action=movie_id)
-                frontier.add(child)
-
-    # No connection found
-    return None
-
-    raise NotImplementedError
+    By default the search runs from both ends and meets in the middle;
+    pass `bidirectional=False` for a plain breadth-first search.
+    """
+    source_index = graph.person_index(source)
+    if source_index is None:
+        raise KeyError(source)
+    target_index = graph.person_index(target)
+    if target_index is None:
+        raise KeyError(target)
+
+    engine = search.bidirectional if bidirectional else search.breadth_first
+    path = engine(graph, source_index, target_index)
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
 
 
 def person_id_for_name(name):
@@ -134,6 +139,12 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        suggestions = name_index.search(name, limit=5)
+        if suggestions:
+            print("Did you mean:")
+            for person in suggestions:
+                print(f"  {person['name']} "
+                      f"(ID: {person['person_id']}, Birth: {person['birth']})")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -158,12 +169,13 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    person = graph.person_index(person_id)
+    if person is None:
+        raise KeyError(person_id)
+    return {
+        (graph.movie_ids[movie], graph.person_ids[star])
+        for movie, star in graph.neighbors(person)
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,768 @@
+"""
+Compact, integer-indexed movie graph used by degrees.py.
+
+People and movies are interned into dense integer indices. Their string
+attributes live in one UTF-8 blob per column, and who-starred-in-what is
+kept as two CSR adjacencies (offset + neighbor arrays): person -> movies
+and movie -> stars.
+
+The whole structure is written to a binary cache file next to the CSVs
+and memory-mapped back on later runs, so a warm start does no parsing.
+The cache is rebuilt whenever the size or mtime of a CSV changes.
+
+Searches expand people through `costars`, which returns deduplicated
+co-star lists: either slices of a precomputed person -> co-star CSR
+adjacency (see `python graph.py directory --costars`) or lists computed
+on demand and memoized in an LRU-bounded NeighborCache.
+
+Usage: python graph.py [directory] [--costars] [--rebuild]
+"""
+import argparse
+import array
+import bisect
+import csv
+import gc
+import json
+import mmap
+import operator
+import os
+import sys
+import time
+from itertools import accumulate, count, groupby, islice, repeat
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from processes import peak_memory
+
+CACHE_FILE = "graph.cache"
+CACHE_MAGIC = b"DEGRAPH\x02"
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Columns stored in the cache: string tables, dictionary-coded string
+# columns, then integer arrays
+STRING_COLUMNS = (
+    "person_ids", "person_names",
+    "movie_ids", "movie_titles",
+)
+CODED_COLUMNS = ("person_births", "movie_years")
+INDEX_COLUMNS = (
+    "person_offsets", "person_movies",
+    "movie_offsets", "movie_stars",
+    "person_id_order", "movie_id_order", "name_order",
+)
+
+# Precomputed co-star adjacency, only present once it has been built
+COSTAR_COLUMNS = ("costar_offsets", "costar_movies", "costar_people")
+
+# Offsets use 64-bit integers, dense indices 32-bit ones
+OFFSET_TYPE = "q"
+INDEX_TYPE = "i"
+
+# Rows parsed per chunk, and between two progress reports, while building
+CHUNK_ROWS = 10000
+PROGRESS_ROWS = 100000
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus an
+    offsets array; strings are only decoded when they are accessed.
+    """
+
+    def __init__(self, blob=None, offsets=None):
+        self.blob = bytearray() if blob is None else blob
+        self.offsets = (array.array(OFFSET_TYPE, [0])
+                        if offsets is None else offsets)
+
+    @classmethod
+    def from_strings(cls, strings):
+        table = cls()
+        for string in strings:
+            table.append(string)
+        return table
+
+    def append(self, string):
+        self.blob += string.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def extend(self, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        ends = accumulate(map(len, encoded), initial=len(self.blob))
+        self.offsets.extend(islice(ends, 1, None))
+        self.blob += b"".join(encoded)
+
+    def sections(self, name):
+        return [(name, self.blob), (name + ".offsets", self.offsets)]
+
+    @classmethod
+    def from_sections(cls, sections, name):
+        return cls(sections[name], sections[name + ".offsets"])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class CodedColumn():
+    """
+    Read-only sequence of strings drawn from few distinct values (such as
+    years), stored as a table of the distinct values plus one code per
+    row.
+    """
+
+    def __init__(self, values=None, codes=None):
+        self.values = StringTable() if values is None else values
+        self.codes = array.array(INDEX_TYPE) if codes is None else codes
+        self.decoded = list(self.values)
+        self.lookup = {value: code for code, value in enumerate(self.decoded)}
+
+    def append(self, string):
+        code = self.lookup.get(string)
+        if code is None:
+            code = len(self.decoded)
+            self.values.append(string)
+            self.decoded.append(string)
+            self.lookup[string] = code
+        self.codes.append(code)
+
+    def extend(self, strings):
+        for string in dict.fromkeys(strings):
+            if string in self.lookup:
+                continue
+            self.lookup[string] = len(self.decoded)
+            self.values.append(string)
+            self.decoded.append(string)
+        self.codes.extend(map(self.lookup.__getitem__, strings))
+
+    def sections(self, name):
+        return self.values.sections(name) + [(name + ".codes", self.codes)]
+
+    @classmethod
+    def from_sections(cls, sections, name):
+        return cls(StringTable.from_sections(sections, name),
+                   sections[name + ".codes"])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.decoded[self.codes[i]]
+
+
+class MovieGraph():
+    """
+    Movie graph with people and movies interned to dense indices.
+
+    `people`, `movies` and `names` are read-only mappings keyed by IMDB
+    id (or lowercase name) that mirror the dictionaries degrees.py used
+    to build, so code written against those keeps working.
+    """
+
+    def __init__(self, cache_entries=100000, cache_bytes=64 * 2 ** 20):
+        for column in STRING_COLUMNS:
+            setattr(self, column, StringTable())
+        for column in CODED_COLUMNS:
+            setattr(self, column, CodedColumn())
+        for column in INDEX_COLUMNS:
+            setattr(self, column, array.array(INDEX_TYPE))
+        self.person_offsets = array.array(OFFSET_TYPE, [0])
+        self.movie_offsets = array.array(OFFSET_TYPE, [0])
+        self.drop_costars()
+        self.neighbor_cache = NeighborCache(cache_entries, cache_bytes)
+        self.people = PeopleView(self)
+        self.movies = MoviesView(self)
+        self.names = NamesView(self)
+        self._mmap = None
+
+    def load(self, directory, costars=False, progress=None):
+        """
+        Load the graph for a data directory, reusing the binary cache
+        when it matches the current CSV files. With `costars`, also make
+        sure the cache holds the precomputed co-star adjacency.
+        `progress` is passed on to `build`.
+        """
+        path = os.path.join(directory, CACHE_FILE)
+        fingerprint = source_fingerprint(directory)
+        self.neighbor_cache.clear()
+        if not self.read_cache(path, fingerprint):
+            self.build(directory, progress)
+            if costars:
+                self.precompute_costars()
+            self.write_cache(path, fingerprint)
+        elif costars and not self.has_costars():
+            self.precompute_costars()
+            self.write_cache(path, fingerprint)
+
+    def build(self, directory, progress=None):
+        """
+        Parse the CSV files of a data directory into the compact graph.
+
+        Files are read in chunks of CHUNK_ROWS rows that are appended
+        column by column to the compact stores, so apart from the id ->
+        index maps (and the names while they are sorted) no per-row
+        Python objects outlive their chunk. If given,
+        `progress(filename, rows)` is called every PROGRESS_ROWS rows and
+        at the end of each file.
+        """
+        # Nothing built here forms reference cycles, so spare the cyclic
+        # garbage collector from rescanning the growing id maps
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            self.parse(directory, progress)
+        finally:
+            if collecting:
+                gc.enable()
+
+    def parse(self, directory, progress):
+        self.drop_costars()
+        self.person_ids = StringTable()
+        self.person_names = StringTable()
+        self.person_births = CodedColumn()
+        person_index = {}
+        lower_names = []
+        for ids, names, births in read_columns(
+            directory, "people.csv", ("id", "name", "birth"), progress
+        ):
+            person_index.update(zip(ids, count(len(person_index))))
+            lower_names.extend(map(str.lower, names))
+            self.person_ids.extend(ids)
+            self.person_names.extend(names)
+            self.person_births.extend(births)
+        self.person_id_order = sorted_order(person_index)
+        self.name_order = sorted_order(lower_names)
+        del lower_names
+
+        self.movie_ids = StringTable()
+        self.movie_titles = StringTable()
+        self.movie_years = CodedColumn()
+        movie_index = {}
+        for ids, titles, years in read_columns(
+            directory, "movies.csv", ("id", "title", "year"), progress
+        ):
+            movie_index.update(zip(ids, count(len(movie_index))))
+            self.movie_ids.extend(ids)
+            self.movie_titles.extend(titles)
+            self.movie_years.extend(years)
+        self.movie_id_order = sorted_order(movie_index)
+
+        credited_people = array.array(INDEX_TYPE)
+        credited_movies = array.array(INDEX_TYPE)
+        for person_ids, movie_ids in read_columns(
+            directory, "stars.csv", ("person_id", "movie_id"), progress
+        ):
+            people = list(map(person_index.get, person_ids))
+            movies = list(map(movie_index.get, movie_ids))
+            if None in people or None in movies:
+                known = [i for i, (person, movie) in
+                         enumerate(zip(people, movies))
+                         if person is not None and movie is not None]
+                people = [people[i] for i in known]
+                movies = [movies[i] for i in known]
+            credited_people.extend(people)
+            credited_movies.extend(movies)
+        del person_index, movie_index
+        self.link(credited_people, credited_movies)
+
+    def link(self, credited_people, credited_movies):
+        """
+        Build both CSR adjacencies from parallel arrays of the people and
+        movies of each credit, dropping duplicate credits.
+        """
+        n_people = len(self.person_ids)
+        n_movies = len(self.movie_ids)
+
+        # Encode each credit as one integer so duplicates collapse and
+        # sorting groups the credits by person (or, flipped, by movie)
+        codes = sorted(map(
+            operator.add,
+            map(operator.mul, credited_people, repeat(n_movies)),
+            credited_movies
+        ))
+        codes = [code for code, _ in groupby(codes)]
+        people = array.array(INDEX_TYPE, map(
+            operator.floordiv, codes, repeat(n_movies)
+        ))
+        self.person_movies = array.array(INDEX_TYPE, map(
+            operator.mod, codes, repeat(n_movies)
+        ))
+        del codes
+        self.person_offsets = csr_offsets(people, n_people)
+
+        codes = sorted(map(
+            operator.add,
+            map(operator.mul, self.person_movies, repeat(n_people)),
+            people
+        ))
+        del people
+        self.movie_stars = array.array(INDEX_TYPE, map(
+            operator.mod, codes, repeat(n_people)
+        ))
+        movies = array.array(INDEX_TYPE, map(
+            operator.floordiv, codes, repeat(n_people)
+        ))
+        del codes
+        self.movie_offsets = csr_offsets(movies, n_movies)
+
+    def read_cache(self, path, fingerprint):
+        """
+        Memory-map the cache at `path` into this graph.
+        Returns False if the cache is missing, unreadable or stale.
+        """
+        sections, mapped = read_sections(path, CACHE_MAGIC, fingerprint)
+        if sections is None:
+            return False
+        try:
+            for column in STRING_COLUMNS:
+                setattr(self, column,
+                        StringTable.from_sections(sections, column))
+            for column in CODED_COLUMNS:
+                setattr(self, column,
+                        CodedColumn.from_sections(sections, column))
+            for column in INDEX_COLUMNS:
+                setattr(self, column, sections[column])
+        except KeyError:
+            return False
+        self.drop_costars()
+        if "costar_offsets" in sections:
+            for column in COSTAR_COLUMNS:
+                setattr(self, column, sections[column])
+        self._mmap = mapped
+        return True
+
+    def write_cache(self, path, fingerprint):
+        """
+        Write this graph to a cache file at `path`.
+        """
+        arrays = []
+        for column in STRING_COLUMNS + CODED_COLUMNS:
+            arrays.extend(getattr(self, column).sections(column))
+        columns = INDEX_COLUMNS
+        if self.has_costars():
+            columns += COSTAR_COLUMNS
+        for column in columns:
+            arrays.append((column, getattr(self, column)))
+        write_sections(path, CACHE_MAGIC, fingerprint, arrays)
+
+    def precompute_costars(self):
+        """
+        Builds the person -> co-star CSR adjacency, so that `costars`
+        becomes a slice lookup.
+        """
+        offsets = array.array(OFFSET_TYPE, [0])
+        movies = array.array(INDEX_TYPE)
+        people = array.array(INDEX_TYPE)
+        for person in range(len(self.person_ids)):
+            person_movies, person_costars = self.collect_costars(person)
+            movies.extend(person_movies)
+            people.extend(person_costars)
+            offsets.append(len(people))
+        self.costar_offsets = offsets
+        self.costar_movies = movies
+        self.costar_people = people
+        self.neighbor_cache.clear()
+
+    def has_costars(self):
+        return len(self.costar_offsets) > 1
+
+    def drop_costars(self):
+        self.costar_offsets = array.array(OFFSET_TYPE, [0])
+        self.costar_movies = array.array(INDEX_TYPE)
+        self.costar_people = array.array(INDEX_TYPE)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index for an IMDB person id, or None.
+        """
+        return find(self.person_id_order, self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index for an IMDB movie id, or None.
+        """
+        return find(self.movie_id_order, self.movie_ids, movie_id)
+
+    def people_named(self, name):
+        """
+        Returns the indices of all people whose lowercase name is `name`.
+        """
+        key = self.lower_name
+        start = bisect.bisect_left(self.name_order, name, key=key)
+        end = bisect.bisect_right(self.name_order, name, lo=start, key=key)
+        return list(self.name_order[start:end])
+
+    def lower_name(self, person):
+        return self.person_names[person].lower()
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices who starred in a movie.
+        """
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred with a
+        given person, including the person themself.
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for movie in self.movies_of(person):
+            for star in movie_stars[movie_offsets[movie]:
+                                    movie_offsets[movie + 1]]:
+                yield movie, star
+
+    def costars(self, person):
+        """
+        Returns (movie, person) index pairs with one shared movie for each
+        distinct co-star of a person, excluding the person themself.
+        """
+        if self.has_costars():
+            offsets = self.costar_offsets
+            start, end = offsets[person], offsets[person + 1]
+            return zip(self.costar_movies[start:end],
+                       self.costar_people[start:end])
+        entry = self.neighbor_cache.get(person)
+        if entry is None:
+            entry = self.collect_costars(person)
+            self.neighbor_cache.put(person, entry)
+        return zip(*entry)
+
+    def collect_costars(self, person):
+        """
+        Returns parallel (movies, people) arrays of a person's distinct
+        co-stars, each with the first movie they share.
+        """
+        first_movie = {}
+        for movie, star in self.neighbors(person):
+            if star not in first_movie:
+                first_movie[star] = movie
+        first_movie.pop(person, None)
+        return (array.array(INDEX_TYPE, first_movie.values()),
+                array.array(INDEX_TYPE, first_movie.keys()))
+
+
+class NeighborCache():
+    """
+    Memo of co-star lists, evicting the least recently used people once
+    either the entry count or the bytes held exceed their limits.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, person):
+        entry = self.entries.get(person)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(person)
+        self.hits += 1
+        return entry
+
+    def put(self, person, entry):
+        size = sum(values.itemsize * len(values) for values in entry)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        self.entries[person] = entry
+        self.bytes += size
+        while (len(self.entries) > self.max_entries
+               or self.bytes > self.max_bytes):
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= sum(values.itemsize * len(values)
+                              for values in evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class PeopleView(Mapping):
+    """
+    Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie]
+                       for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person]
+                      for person in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Maps lowercase names to a set of corresponding person_ids
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        people = graph.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        previous = None
+        for person in self.graph.name_order:
+            name = self.graph.lower_name(person)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def read_sections(path, magic, fingerprint):
+    """
+    Memory-maps a cache file written by `write_sections`.
+    Returns a dict of section name -> memoryview plus the mmap backing
+    them, or (None, None) if the file is missing, unreadable or stale.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None, None
+    view = memoryview(mapped)
+    try:
+        if bytes(view[:len(magic)]) != magic:
+            return None, None
+        start = len(magic) + 8
+        size = int.from_bytes(view[len(magic):start], "little")
+        header = json.loads(bytes(view[start:start + size]))
+        if header["fingerprint"] != fingerprint:
+            return None, None
+        # A truncated file can still have a valid header
+        for offset, length, _ in header["sections"].values():
+            if offset < 0 or length < 0 or offset + length > len(view):
+                return None, None
+        sections = {
+            name: view[offset:offset + length].cast(typecode)
+            for name, (offset, length, typecode)
+            in header["sections"].items()
+        }
+    except (ValueError, KeyError, TypeError):
+        return None, None
+    return sections, mapped
+
+
+def write_sections(path, magic, fingerprint, arrays):
+    """
+    Writes (name, values) arrays to a cache file: `magic`, a JSON header
+    holding `fingerprint` and the section table, then each array's raw
+    bytes aligned to 8 bytes. Failing to write the cache (for example in
+    a read-only data directory) is not an error.
+    """
+    sections = []
+    for name, values in arrays:
+        values = memoryview(values)
+        sections.append((name, values.format, values.cast("B")))
+
+    # Lay sections out after the header, sized for the largest offsets
+    header = {"fingerprint": fingerprint, "sections": {}}
+    placeholder = json.dumps(
+        dict(header, sections={
+            name: [2 ** 62, 2 ** 62, typecode]
+            for name, typecode, _ in sections
+        })
+    ).encode("utf-8")
+    offset = align(len(magic) + 8 + len(placeholder))
+    for name, typecode, values in sections:
+        header["sections"][name] = [offset, len(values), typecode]
+        offset = align(offset + len(values))
+    encoded = json.dumps(header).encode("utf-8")
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(magic)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for name, _, values in sections:
+                f.write(bytes(header["sections"][name][0] - f.tell()))
+                f.write(values)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def source_fingerprint(directory):
+    """
+    Returns the (size, mtime) of each CSV file the graph is built from.
+    """
+    fingerprint = []
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        fingerprint.append([stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def read_columns(directory, filename, columns, progress=None):
+    """
+    Reads the named `columns` of a CSV file, looking them up by their
+    position in the header. Yields one tuple of values per column for
+    each chunk of up to CHUNK_ROWS rows; truncated rows are skipped.
+    """
+    with open(os.path.join(directory, filename), encoding="utf-8",
+              newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        select = operator.itemgetter(
+            *[header.index(column) for column in columns]
+        )
+        width = len(header)
+        rows = 0
+        while True:
+            chunk = list(islice(reader, CHUNK_ROWS))
+            if not chunk:
+                break
+            reported = rows // PROGRESS_ROWS
+            rows += len(chunk)
+            try:
+                selected = list(map(select, chunk))
+            except IndexError:
+                selected = [select(row) for row in chunk if len(row) >= width]
+            if selected:
+                yield tuple(zip(*selected))
+            if progress is not None and rows // PROGRESS_ROWS > reported:
+                progress(filename, rows)
+        if progress is not None and rows % PROGRESS_ROWS:
+            progress(filename, rows)
+
+
+def csr_offsets(rows, n_rows):
+    """
+    Returns the CSR offsets array for `rows`, the sorted row numbers of
+    all entries.
+    """
+    return array.array(OFFSET_TYPE, map(
+        bisect.bisect_left, repeat(rows), range(n_rows + 1)
+    ))
+
+
+def sorted_order(keys):
+    """
+    Returns an index array that lists the sequence `keys` (or the keys
+    of a dict, in insertion order) in sorted order.
+    """
+    keys = list(keys)
+    return array.array(INDEX_TYPE, sorted(range(len(keys)),
+                                          key=keys.__getitem__))
+
+
+def find(order, table, key):
+    """
+    Binary-searches `order`, an index array sorting `table`, for `key`.
+    Returns the matching index into `table`, or None.
+    """
+    i = bisect.bisect_left(order, key, key=table.__getitem__)
+    if i < len(order) and table[order[i]] == key:
+        return order[i]
+    return None
+
+
+def align(offset, boundary=8):
+    return (offset + boundary - 1) // boundary * boundary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or refresh the binary graph cache."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--costars", action="store_true",
+                        help="also precompute the co-star adjacency")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="parse the CSV files even if the cache is fresh")
+    args = parser.parse_args()
+
+    def progress(filename, rows):
+        print(f"  {filename}: {rows} rows", file=sys.stderr)
+
+    start = time.perf_counter()
+    graph = MovieGraph()
+    if args.rebuild:
+        try:
+            os.remove(os.path.join(args.directory, CACHE_FILE))
+        except FileNotFoundError:
+            pass
+    graph.load(args.directory, costars=args.costars, progress=progress)
+    print(f"Graph ready in {time.perf_counter() - start:.3f}s: "
+          f"{len(graph.person_ids)} people, {len(graph.movie_ids)} movies, "
+          f"{len(graph.person_movies)} credits")
+    if graph.has_costars():
+        print(f"Co-star adjacency: {len(graph.costar_people)} entries")
+    peak = peak_memory()
+    if peak is not None:
+        print(f"Peak memory: {peak / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
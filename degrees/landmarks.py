@@ -0,0 +1,269 @@
+"""
+Landmark-based distance oracle for degrees.
+
+A handful of well-connected landmark actors are searched from once and
+their distances to every person are stored in a compact cache file next
+to the CSVs. For any pair of people the triangle inequality then gives
+bounds on their degrees of separation:
+
+    |d(L, s) - d(L, t)|  <=  d(s, t)  <=  d(L, s) + d(L, t)
+
+When the bounds meet the distance is known without searching; otherwise
+the lower bound serves as an A* heuristic (ALT search) and the upper
+bound prunes it.
+
+Usage: python landmarks.py build [directory] [-k K]
+       python landmarks.py query [directory] PERSON PERSON
+"""
+import argparse
+import array
+import os
+import sys
+import time
+
+import search
+from batch import resolve
+from graph import (INDEX_TYPE, MovieGraph, read_sections, source_fingerprint,
+                   write_sections)
+from util import Node, PriorityFrontier
+
+LANDMARKS_FILE = "landmarks.cache"
+LANDMARKS_MAGIC = b"DEGLMRK\x02"
+
+
+class LandmarkIndex():
+    """
+    Distances from each landmark to every person, one row per landmark.
+    The largest value of the row typecode marks people not connected to
+    the landmark.
+    """
+
+    def __init__(self, landmarks, rows, typecode):
+        self.landmarks = landmarks
+        self.rows = rows
+        self.typecode = typecode
+        self.unreachable = 2 ** (8 * array.array(typecode).itemsize) - 1
+        self._mmap = None
+
+    @classmethod
+    def build(cls, graph, k):
+        """
+        Searches from the `k` best-connected people of the graph.
+        """
+        landmarks = choose_landmarks(graph, k)
+        trees = [search.single_source(graph, landmark)
+                 for landmark in landmarks]
+        deepest = max((max(tree.distance, default=0) for tree in trees),
+                      default=0)
+        typecode = "B" if deepest < 255 else "H"
+        index = cls(landmarks, [], typecode)
+        for tree in trees:
+            index.rows.append(array.array(typecode, (
+                distance if distance >= 0 else index.unreachable
+                for distance in tree.distance
+            )))
+        return index
+
+    @classmethod
+    def load(cls, path, fingerprint, people):
+        """
+        Memory-maps a landmark cache file.
+        Returns None if it is missing, damaged, was built from other CSV
+        files, or does not have a distance for each of `people` people.
+        """
+        sections, mapped = read_sections(path, LANDMARKS_MAGIC, fingerprint)
+        if sections is None:
+            return None
+        try:
+            landmarks = sections["landmarks"].tolist()
+            rows = [sections[f"row.{i}"] for i in range(len(landmarks))]
+        except KeyError:
+            return None
+        if any(len(row) != people for row in rows):
+            return None
+        typecode = rows[0].format if rows else "B"
+        if any(row.format != typecode or typecode not in ("B", "H")
+               for row in rows):
+            return None
+        index = cls(landmarks, rows, typecode)
+        index._mmap = mapped
+        return index
+
+    def save(self, path, fingerprint):
+        write_sections(path, LANDMARKS_MAGIC, fingerprint, [
+            ("landmarks", array.array(INDEX_TYPE, self.landmarks)),
+            *[(f"row.{i}", row) for i, row in enumerate(self.rows)]
+        ])
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two people. Returns (None, None) if some landmark reaches only one
+        of them, which means they are not connected; upper is None if no
+        landmark reaches both.
+        """
+        unreachable = self.unreachable
+        lower = 0
+        upper = None
+        for row in self.rows:
+            to_source = row[source]
+            to_target = row[target]
+            if to_source == unreachable or to_target == unreachable:
+                if to_source != to_target:
+                    return None, None
+                continue
+            lower = max(lower, abs(to_source - to_target))
+            if upper is None or to_source + to_target < upper:
+                upper = to_source + to_target
+        return lower, upper
+
+    def distance(self, graph, source, target, stats=None):
+        """
+        Returns the degrees of separation between two people, or None if
+        they are not connected.
+
+        Searches only when the bounds differ, and then only for paths
+        shorter than the upper bound: if none exists, the upper bound is
+        the answer.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower is None or lower == upper:
+            if stats is not None:
+                stats["explored"] = 0
+            return lower
+        path = search.bidirectional(
+            graph, source, target, stats,
+            max_depth=None if upper is None else upper - 1
+        )
+        return upper if path is None else len(path)
+
+    def shortest_path(self, graph, source, target, stats=None):
+        """
+        A* search guided by the landmark lower bound (ALT), pruning people
+        whose bound already exceeds the landmark upper bound.
+        Returns (movie, person) index pairs like the search module.
+        """
+        lower, upper = self.bounds(source, target)
+        explored = set()
+        try:
+            if lower is None:
+                return None
+            unreachable = self.unreachable
+            targets = [(row, row[target]) for row in self.rows]
+
+            def heuristic(person):
+                best = 0
+                for row, to_target in targets:
+                    to_person = row[person]
+                    if to_person == unreachable or to_target == unreachable:
+                        if to_person != to_target:
+                            return None
+                        continue
+                    best = max(best, abs(to_person - to_target))
+                return best
+
+            frontier = PriorityFrontier()
+            frontier.add(Node(state=source, parent=None, action=None),
+                         (lower, 0))
+            costs = {source: 0}
+            while not frontier.empty():
+                node = frontier.remove()
+                if node.state == target:
+                    path = []
+                    while node.parent is not None:
+                        path.append((node.action, node.state))
+                        node = node.parent
+                    path.reverse()
+                    return path
+                if node.state in explored:
+                    continue
+                explored.add(node.state)
+
+                cost = costs[node.state] + 1
+                for movie, person in graph.costars(node.state):
+                    if person in explored:
+                        continue
+                    if costs.get(person, cost + 1) <= cost:
+                        continue
+                    estimate = heuristic(person)
+                    if estimate is None:
+                        continue
+                    if upper is not None and cost + estimate > upper:
+                        continue
+                    costs[person] = cost
+                    child = Node(state=person, parent=node, action=movie)
+                    # Prefer deeper nodes among equal estimates
+                    frontier.add(child, (cost + estimate, -cost))
+            return None
+        finally:
+            if stats is not None:
+                stats["explored"] = len(explored)
+
+
+def choose_landmarks(graph, k):
+    """
+    Returns the `k` people with the most co-star appearances.
+    """
+    movie_offsets = graph.movie_offsets
+    cast_sizes = [movie_offsets[movie + 1] - movie_offsets[movie]
+                  for movie in range(len(graph.movie_ids))]
+    degree = [
+        sum(cast_sizes[movie] - 1 for movie in graph.movies_of(person))
+        for person in range(len(graph.person_ids))
+    ]
+    ranked = sorted(range(len(degree)), key=degree.__getitem__, reverse=True)
+    return ranked[:k]
+
+
+def load_or_build(graph, directory, k=None):
+    """
+    Returns the landmark index for a loaded graph, building and caching
+    it if the cache is missing, stale or was built with another `k`.
+    """
+    path = os.path.join(directory, LANDMARKS_FILE)
+    fingerprint = source_fingerprint(directory)
+    index = LandmarkIndex.load(path, fingerprint, len(graph.person_ids))
+    if index is None or (k is not None and len(index.landmarks) != k):
+        index = LandmarkIndex.build(graph, 16 if k is None else k)
+        index.save(path, fingerprint)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Landmark distance oracle.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("build", help="build the landmark cache")
+    command.add_argument("directory", nargs="?", default="large")
+    command.add_argument("-k", type=int, default=16,
+                         help="number of landmarks (default: 16)")
+    command = commands.add_parser("query", help="degrees between two people")
+    command.add_argument("directory", nargs="?", default="large")
+    command.add_argument("people", nargs=2, metavar="PERSON")
+    args = parser.parse_args()
+
+    graph = MovieGraph()
+    graph.load(args.directory)
+    if args.command == "build":
+        start = time.perf_counter()
+        index = load_or_build(graph, args.directory, args.k)
+        print(f"{len(index.landmarks)} landmarks ready in "
+              f"{time.perf_counter() - start:.3f}s")
+        return
+
+    source, error = resolve(graph, args.people[0])
+    if error is None:
+        target, error = resolve(graph, args.people[1])
+    if error is not None:
+        sys.exit(error)
+    index = load_or_build(graph, args.directory)
+    lower, upper = index.bounds(source, target)
+    if lower is None:
+        sys.exit("Not connected.")
+    print(f"Bounds: {lower} to {'?' if upper is None else upper} degrees")
+    distance = index.distance(graph, source, target)
+    print("Not connected." if distance is None
+          else f"{distance} degrees of separation.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Name search over a MovieGraph.
+
+Exact and prefix lookups binary-search the graph's `name_order`, the
+person indices sorted by lowercase name, so they need no extra index.
+Typo-tolerant search uses a trigram index (trigram -> people whose name
+contains it) that is built on first use and cached in names.cache next
+to the CSVs.
+
+All searches return ranked candidates as dictionaries of person_id,
+name, birth and score, and never ask the user to disambiguate.
+"""
+import array
+import bisect
+import os
+from collections import Counter, defaultdict
+
+from graph import (INDEX_TYPE, OFFSET_TYPE, StringTable, read_sections,
+                   source_fingerprint, write_sections)
+
+NAMES_FILE = "names.cache"
+NAMES_MAGIC = b"DEGNAME\x01"
+
+# Sorts after every character that can follow a prefix
+PREFIX_END = chr(0x10FFFF)
+
+# Fuzzy candidates re-scored on their full trigram sets per result wanted
+CANDIDATES_PER_RESULT = 20
+
+
+class NameIndex():
+    """
+    Exact, prefix and fuzzy name search for the people of a graph.
+    """
+
+    def __init__(self, graph, directory=None):
+        self.graph = graph
+        self.directory = directory
+        self.grams = None
+        self.gram_offsets = None
+        self.gram_people = None
+        self._mmap = None
+
+    def exact(self, name, limit=None):
+        """
+        Returns the people whose name is `name`, ignoring case.
+        """
+        people = self.graph.people_named(name.lower())
+        return [self.candidate(person, 1.0) for person in people[:limit]]
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` people whose name starts with `prefix`,
+        ignoring case, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        order = self.graph.name_order
+        key = self.graph.lower_name
+        start = bisect.bisect_left(order, prefix, key=key)
+        end = bisect.bisect_left(order, prefix + PREFIX_END, lo=start,
+                                 key=key)
+        end = min(end, start + limit)
+        return [
+            self.candidate(person, len(prefix) / max(len(key(person)), 1))
+            for person in order[start:end]
+        ]
+
+    def fuzzy(self, query, limit=10):
+        """
+        Returns up to `limit` people whose name shares the most trigrams
+        with `query`, best match first.
+        """
+        self.ensure_grams()
+        wanted = trigrams(query.lower())
+        if not wanted:
+            return []
+
+        # A name missing at most `slack` of the query's trigrams contains
+        # one of any `slack + 1` of them. Trigrams no name has are missing
+        # from every candidate, so the rest of the slack is spent on the
+        # rarest trigrams that do occur
+        postings = sorted(
+            (self.posting(gram) for gram in wanted), key=len
+        )
+        occurring = [posting for posting in postings if posting]
+        slack = 2 * len(wanted) // 3 - (len(postings) - len(occurring))
+        counts = Counter()
+        for posting in occurring[:max(slack, 0) + 1]:
+            counts.update(posting)
+
+        # Fully score only the candidates sharing the most rare trigrams
+        scored = []
+        for person, _ in counts.most_common(limit * CANDIDATES_PER_RESULT):
+            grams = trigrams(self.graph.lower_name(person))
+            shared = len(wanted & grams)
+            score = shared / (len(wanted) + len(grams) - shared)
+            scored.append((-score, person))
+        scored.sort()
+        return [self.candidate(person, -score)
+                for score, person in scored[:limit]]
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` candidates for `query`: exact matches first,
+        then prefix matches, then fuzzy matches.
+        """
+        results = self.exact(query, limit)
+        seen = {result["person_id"] for result in results}
+        for lookup in (self.prefix, self.fuzzy):
+            if len(results) >= limit:
+                break
+            for result in lookup(query, limit):
+                if result["person_id"] not in seen:
+                    seen.add(result["person_id"])
+                    results.append(result)
+        return results[:limit]
+
+    def candidate(self, person, score):
+        graph = self.graph
+        return {
+            "person_id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "score": round(score, 3)
+        }
+
+    def posting(self, gram):
+        i = bisect.bisect_left(self.grams, gram)
+        if i == len(self.grams) or self.grams[i] != gram:
+            return ()
+        return self.gram_people[self.gram_offsets[i]:self.gram_offsets[i + 1]]
+
+    def attach(self, directory):
+        """
+        Points the index at a (newly loaded) data directory, whose cached
+        trigram index is loaded on the first fuzzy search.
+        """
+        self.directory = directory
+        self.grams = None
+        self.gram_offsets = None
+        self.gram_people = None
+        self._mmap = None
+
+    def ensure_grams(self):
+        if self.grams is None:
+            if self.directory is None:
+                self.build_grams()
+            else:
+                self.load(self.directory)
+
+    def build_grams(self):
+        """
+        Builds the trigram index over all names.
+        """
+        postings = defaultdict(lambda: array.array(INDEX_TYPE))
+        for person, name in enumerate(self.graph.person_names):
+            for gram in trigrams(name.lower()):
+                postings[gram].append(person)
+
+        grams = sorted(postings)
+        offsets = array.array(OFFSET_TYPE, [0])
+        people = array.array(INDEX_TYPE)
+        for gram in grams:
+            people.extend(postings[gram])
+            offsets.append(len(people))
+        self.grams = StringTable.from_strings(grams)
+        self.gram_offsets = offsets
+        self.gram_people = people
+
+    def read_cache(self, path, fingerprint):
+        """
+        Memory-maps the trigram index cached at `path`.
+        Returns False if the cache is missing, unreadable or stale.
+        """
+        sections, mapped = read_sections(path, NAMES_MAGIC, fingerprint)
+        if sections is None:
+            return False
+        try:
+            self.grams = StringTable.from_sections(sections, "grams")
+            self.gram_offsets = sections["gram_offsets"]
+            self.gram_people = sections["gram_people"]
+        except (KeyError, ValueError):
+            return False
+        self._mmap = mapped
+        return True
+
+    def load(self, directory):
+        """
+        Loads the trigram index cached for a data directory, building and
+        caching it if the cache is missing or stale.
+        """
+        path = os.path.join(directory, NAMES_FILE)
+        fingerprint = source_fingerprint(directory)
+        if self.read_cache(path, fingerprint):
+            return
+        self.build_grams()
+        write_sections(path, NAMES_MAGIC, fingerprint, [
+            *self.grams.sections("grams"),
+            ("gram_offsets", self.gram_offsets),
+            ("gram_people", self.gram_people),
+        ])
+
+
+def trigrams(text):
+    """
+    Returns the set of three-character substrings of a padded string,
+    so that word starts and ends count as well.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,35 @@
+"""
+Process helpers shared by the degrees scripts: a process pool and the
+peak memory of the current process.
+"""
+import multiprocessing
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def fork_pool(processes, initializer=None, initargs=()):
+    """
+    Returns a pool of `processes` workers, forked where the platform
+    allows so that they inherit the parent's data instead of each
+    loading or unpickling their own copy.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "fork" if "fork" in methods else None
+    )
+    return context.Pool(processes, initializer, initargs)
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process in bytes, or None
+    where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,205 @@
+"""
+Search engines over a MovieGraph.
+
+Both engines work on dense person indices and return the shortest list
+of (movie, person) index pairs leading from source to target, or None
+if the two are not connected. Pass a `stats` dict to have the number of
+expanded people recorded under "explored".
+
+single_source runs one search from a person to everyone connected to
+them, so many queries sharing a source can be answered from one BFS.
+"""
+import array
+
+from util import Node, DequeQueueFrontier
+
+
+def breadth_first(graph, source, target, stats=None):
+    """
+    One-sided breadth-first search from source.
+    """
+    # Initialize the frontier with the starting position
+    start = Node(state=source, parent=None, action=None)
+    frontier = DequeQueueFrontier()
+    frontier.add(start)
+
+    # Keep track of visited actors to prevent revisiting
+    explored = set()
+
+    try:
+        while not frontier.empty():
+            node = frontier.remove()
+
+            # If this is the target, reconstruct the path
+            if node.state == target:
+                path = []
+                while node.parent is not None:
+                    path.append((node.action, node.state))
+                    node = node.parent
+                path.reverse()
+                return path
+
+            # Mark this node as explored
+            explored.add(node.state)
+
+            # Expand neighbors
+            for movie, person in graph.costars(node.state):
+                if (person not in explored
+                        and not frontier.contains_state(person)):
+                    child = Node(state=person, parent=node, action=movie)
+                    frontier.add(child)
+
+        # No connection found
+        return None
+    finally:
+        if stats is not None:
+            stats["explored"] = len(explored)
+
+
+def bidirectional(graph, source, target, stats=None, max_depth=None):
+    """
+    Breadth-first search from both ends at once, always expanding the
+    smaller frontier by one full level, until the two searches meet.
+
+    With `max_depth`, gives up (returning None) once no path of at most
+    that many degrees exists.
+    """
+    if source == target:
+        if stats is not None:
+            stats["explored"] = 0
+        return []
+
+    # Each side maps a visited person to the (movie, person) step that
+    # leads back towards the side's root
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    explored = 0
+    depth = 0
+
+    meeting = None
+    while meeting is None and forward_frontier and backward_frontier:
+        if max_depth is not None and depth >= max_depth:
+            break
+        depth += 1
+        if len(forward_frontier) <= len(backward_frontier):
+            explored += len(forward_frontier)
+            forward_frontier, meeting = expand(
+                graph, forward_frontier, forward, backward
+            )
+        else:
+            explored += len(backward_frontier)
+            backward_frontier, meeting = expand(
+                graph, backward_frontier, backward, forward
+            )
+
+    if stats is not None:
+        stats["explored"] = explored
+    if meeting is None:
+        return None
+    return splice(forward, backward, meeting)
+
+
+def single_source(graph, source):
+    """
+    Breadth-first search from source to every connected person.
+    Returns the resulting ShortestPathTree.
+    """
+    tree = ShortestPathTree(len(graph.person_ids), source)
+    distance = tree.distance
+    via_movie = tree.via_movie
+    via_person = tree.via_person
+
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        following = []
+        for person in frontier:
+            for movie, star in graph.costars(person):
+                if distance[star] < 0:
+                    distance[star] = depth
+                    via_movie[star] = movie
+                    via_person[star] = person
+                    following.append(star)
+        frontier = following
+    return tree
+
+
+class ShortestPathTree():
+    """
+    Distances and BFS parents from one source to every person, stored in
+    flat arrays indexed by person; -1 marks people not connected.
+    """
+
+    def __init__(self, n_people, source):
+        self.source = source
+        self.distance = array.array("i", [-1]) * n_people
+        self.via_movie = array.array("i", [-1]) * n_people
+        self.via_person = array.array("i", [-1]) * n_people
+        self.distance[source] = 0
+
+    def path(self, target):
+        """
+        Returns the (movie, person) index pairs from the source to target,
+        or None if target is not connected to the source.
+        """
+        if self.distance[target] < 0:
+            return None
+        path = []
+        person = target
+        while person != self.source:
+            path.append((self.via_movie[person], person))
+            person = self.via_person[person]
+        path.reverse()
+        return path
+
+    def reachable(self):
+        """
+        Yields (person, distance) for every person connected to the source.
+        """
+        for person, distance in enumerate(self.distance):
+            if distance >= 0:
+                yield person, distance
+
+
+def expand(graph, frontier, visited, other):
+    """
+    Expands every person in `frontier` by one step, recording new people
+    in `visited`. Returns the next frontier and the first person that was
+    already visited by the `other` search, if any.
+
+    Searches expand whole levels and stop at the first meeting, so all
+    meetings found in one level give paths of the same, shortest length.
+    """
+    following = []
+    for person in frontier:
+        for movie, star in graph.costars(person):
+            if star in visited:
+                continue
+            visited[star] = (movie, person)
+            if star in other:
+                return following, star
+            following.append(star)
+    return following, None
+
+
+def splice(forward, backward, meeting):
+    """
+    Joins the forward path to `meeting` with the backward path from it.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, child = backward[person]
+        path.append((movie, child))
+        person = child
+    return path
@@ -0,0 +1,234 @@
+"""
+Heredity inference for many family files at once.
+
+Each PATH is a CSV file, a directory of CSV files or a glob pattern.
+Families are grouped by shape: the same number of people with the same
+parents at the same positions in the file. Each group is run by one
+worker process, which compiles the shape once; with the junction tree
+engine this is the elimination order and junction tree, and with every
+engine, families of the same shape that also have the same known
+traits reuse the results of the first.
+
+Results are written as JSON lines, one object per file, or as CSV, one
+row per person, with the seconds each file took. A summary with the
+throughput goes to stderr.
+
+Usage: python batch.py PATH [PATH ...] [--engine ENGINE] [--model FILE]
+                       [--format FORMAT] [--output FILE] [--workers N]
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+
+import elimination
+from heredity import ENGINES, MODEL, load_data
+from model import load_model
+from processes import fork_pool
+
+# Files per task, so that large groups of one shape are spread over
+# several workers
+GROUP_SIZE = 64
+
+# Junction trees by family shape, kept by each worker process
+trees = {}
+
+
+def find_files(paths):
+    """
+    Returns the CSV files given by `paths`, each a file, a directory or
+    a glob pattern, in order and without repeats.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.csv")))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            files += sorted(glob.glob(path))
+    return list(dict.fromkeys(files))
+
+
+def shape(people):
+    """
+    Returns the shape of a family: the positions of each person's
+    parents, or None for people without parents.
+    """
+    position = {name: i for i, name in enumerate(people)}
+    return tuple(
+        None if person["mother"] is None and person["father"] is None
+        else (position[person["mother"]], position[person["father"]])
+        for person in people.values()
+    )
+
+
+def plan(files):
+    """
+    Loads the families in `files` and groups them by shape.
+    Returns the list of tasks, each a list of (file, people) pairs of one
+    shape, and the results of files that could not be loaded.
+    """
+    groups = {}
+    errors = []
+    for path in files:
+        try:
+            people = load_data(path)
+            key = shape(people)
+        except (OSError, KeyError, ValueError, csv.Error) as error:
+            errors.append({"file": path, "error": f"{error!r}"})
+            continue
+        groups.setdefault(key, []).append((path, people))
+    tasks = []
+    for group in groups.values():
+        for start in range(0, len(group), GROUP_SIZE):
+            tasks.append(group[start:start + GROUP_SIZE])
+    return tasks, errors
+
+
+def infer_group(task):
+    """
+    Runs inference on every family of one shape; runs inside a worker.
+    Returns one result per file, with the probabilities of its people in
+    file order.
+    """
+    engine, model, group = task
+    results = []
+    reused = {}
+    for path, people in group:
+        start = time.perf_counter()
+        traits = tuple(person["trait"] for person in people.values())
+        cached = traits in reused
+        if cached:
+            rows = reused[traits]
+        else:
+            if engine == "elimination":
+                key = shape(people)
+                if key not in trees:
+                    names, factors = elimination.compile_factors(people,
+                                                                 model)
+                    trees[key] = elimination.JunctionTree(
+                        len(names), [scope for scope, _ in factors]
+                    )
+                probabilities = elimination.infer(people, model, trees[key])
+            else:
+                probabilities = ENGINES[engine](people, model)
+            rows = [probabilities[name] for name in people]
+            reused[traits] = rows
+        results.append({
+            "file": path,
+            "people": dict(zip(people, rows)),
+            "seconds": time.perf_counter() - start,
+            "reused": cached
+        })
+    return results
+
+
+def run_batch(files, engine, write, workers=None, model=MODEL):
+    """
+    Runs inference on the families in `files`, calling `write` with the
+    result of each as soon as its group is done. Returns the number of
+    files and people done and of results reused.
+    """
+    tasks, errors = plan(files)
+    for result in errors:
+        write(result)
+    tasks = [(engine, model, group) for group in tasks]
+    counts = {"files": 0, "people": 0, "reused": 0}
+
+    def done(results):
+        for result in results:
+            counts["files"] += 1
+            counts["people"] += len(result["people"])
+            counts["reused"] += result["reused"]
+            write(result)
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            done(infer_group(task))
+        return counts
+
+    with fork_pool(workers) as pool:
+        for results in pool.imap_unordered(infer_group, tasks):
+            done(results)
+    return counts
+
+
+def jsonl_writer(out):
+    def write(result):
+        result = dict(result)
+        result.pop("reused", None)
+        out.write(json.dumps(result) + "\n")
+    return write
+
+
+def csv_writer(out):
+    writer = csv.writer(out)
+    writer.writerow(["file", "name", "gene_2", "gene_1", "gene_0",
+                     "trait", "seconds"])
+
+    def write(result):
+        if "error" in result:
+            print(f"{result['file']}: {result['error']}", file=sys.stderr)
+            return
+        for name, probabilities in result["people"].items():
+            writer.writerow([
+                result["file"], name,
+                *(f"{probabilities['gene'][genes]:.6f}"
+                  for genes in (2, 1, 0)),
+                f"{probabilities['trait'][True]:.6f}",
+                f"{result['seconds']:.6f}"
+            ])
+    return write
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heredity inference for "
+                                                 "many family files.")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="CSV file, directory or glob pattern")
+    parser.add_argument("--engine", choices=ENGINES, default="elimination",
+                        help="inference engine (default: elimination)")
+    parser.add_argument("--model", metavar="FILE",
+                        help="JSON file of model parameters "
+                             "(default: PROBS of heredity.py)")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        default="jsonl", help="output format "
+                                              "(default: jsonl)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    model = MODEL
+    if args.model is not None:
+        try:
+            model = load_model(args.model)
+        except (OSError, ValueError) as error:
+            sys.exit(f"Could not load model: {error}")
+    files = find_files(args.paths)
+    out = sys.stdout if args.output is None else open(
+        args.output, "w", newline="" if args.format == "csv" else None
+    )
+    try:
+        make_writer = jsonl_writer if args.format == "jsonl" else csv_writer
+        start = time.perf_counter()
+        counts = run_batch(files, args.engine, make_writer(out),
+                           args.workers, model)
+        elapsed = time.perf_counter() - start
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = max(elapsed, 1e-9)
+    print(f"{counts['files']} of {len(files)} files, {counts['people']} "
+          f"people in {elapsed:.3f}s: {counts['files'] / elapsed:.1f} "
+          f"files/s, {counts['people'] / elapsed:.1f} people/s "
+          f"({counts['reused']} results reused)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
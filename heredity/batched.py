@@ -0,0 +1,115 @@
+"""
+Exact heredity inference by enumerating gene assignments in NumPy
+batches.
+
+Every gene assignment is a row of gene counts, one column per person.
+A chunk holds the 3^low assignments of the first `low` people, decoded
+once into an integer array, for one fixed assignment of the remaining
+people. Each person's factor, P(genes | parents' genes) times
+P(trait | genes) for a known trait, is looked up in a 27-entry table
+at 9 * mother genes + 3 * father genes + genes, where the mother and
+father come from a per-person parent-index table. Each factor falls
+into one of three cases:
+
+- It only involves the first `low` people. Then it is the same vector
+  in every chunk and is multiplied in once, up front.
+- It only involves the fixed people. Then it is a scalar for the chunk,
+  and the chunk is skipped when that scalar is 0.
+- It involves both. Then it is gathered for every row.
+
+The products along each row are the joint probabilities. They are
+summed into the gene marginals with one matrix product against a
+one-hot encoding of the chunk's rows, plus a scalar per fixed person.
+As in bitmask.py, known traits are fixed and unknown traits are summed
+out.
+
+Chunks hold at most `chunk_size` assignments, so memory stays bounded
+while the 3^n assignments stream through.
+"""
+import numpy as np
+
+# Assignments per chunk
+CHUNK_SIZE = 3 ** 10
+
+
+def compile_tables(people, names, model):
+    """
+    Returns the columns of each person's mother and father and each
+    person's factor table, indexed [person, mother genes, father genes,
+    genes]. People without parents point at themselves and have the
+    same prior in every row.
+    """
+    position = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    mothers = np.arange(n)
+    fathers = np.arange(n)
+    tables = np.empty((n, 3, 3, 3))
+    for i, name in enumerate(names):
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            tables[i] = model.prior
+        else:
+            mothers[i] = position[person["mother"]]
+            fathers[i] = position[person["father"]]
+            tables[i] = model.inheritance
+        tables[i] *= model.evidence(person["trait"])
+    return mothers, fathers, tables
+
+
+def infer(people, model, chunk_size=CHUNK_SIZE):
+    """
+    Returns the gene and trait distribution of each person given the
+    known traits, in the `probabilities` format of heredity.py.
+    """
+    names = list(people)
+    n = len(names)
+    mothers, fathers, tables = compile_tables(people, names, model)
+    tables = tables.reshape(n, 27)
+
+    # The first `low` people vary within a chunk
+    low = 0
+    while low < n and 3 ** (low + 1) <= chunk_size:
+        low += 1
+    rows = 3 ** low
+    low_counts = np.arange(rows)[:, None] // 3 ** np.arange(low) % 3
+    one_hot = np.zeros((rows, low, 3))
+    one_hot[np.arange(rows)[:, None], np.arange(low), low_counts] = 1
+    one_hot = one_hot.reshape(rows, 3 * low)
+
+    fixed = np.ones(rows)
+    varying = []
+    constant = []
+    for i in range(n):
+        if max(mothers[i], fathers[i], i) < low:
+            fixed *= tables[i, 9 * low_counts[:, mothers[i]]
+                            + 3 * low_counts[:, fathers[i]]
+                            + low_counts[:, i]]
+        elif min(mothers[i], fathers[i], i) >= low:
+            constant.append(i)
+        else:
+            varying.append(i)
+
+    genes = np.zeros((n, 3))
+    for chunk in range(3 ** (n - low)):
+        counts = [chunk // 3 ** j % 3 for j in range(n - low)]
+
+        def column(i):
+            return low_counts[:, i] if i < low else counts[i - low]
+
+        scalar = 1.0
+        for i in constant:
+            scalar *= tables[i, 9 * column(mothers[i])
+                             + 3 * column(fathers[i]) + column(i)]
+        if scalar == 0:
+            continue
+        p = fixed * scalar
+        for i in varying:
+            p *= tables[i, 9 * column(mothers[i])
+                        + 3 * column(fathers[i]) + column(i)]
+        genes[:low] += (p @ one_hot).reshape(low, 3)
+        genes[np.arange(low, n), counts] += p.sum()
+    total = genes[0].sum() if n else 0.0
+    if total > 0:
+        genes /= total
+
+    return model.probabilities(people, names, genes)
@@ -0,0 +1,307 @@
+"""
+Benchmarks for the heredity project.
+
+Usage: python benchmark.py bitmask [--sizes N ...] [--enumeration-max N]
+       python benchmark.py batched [--sizes N ...] [--enumeration-max N]
+       python benchmark.py sampling [--sizes N ...] [--samples N]
+       python benchmark.py model [--sizes N ...] [--families N]
+"""
+import argparse
+import functools
+import gc
+import random
+import sys
+import time
+
+from heredity import ENGINES, MODEL, PROBS, joint_probability, powerset
+from model import Model
+from sampling import SAMPLES
+
+
+def random_family(n_people, seed=None, known=0.5, window=None,
+                  model=None):
+    """
+    Returns a random family of `n_people` in the format of `load_data`.
+    About two thirds of the people after the first two are children of
+    two of the people before them, or of the `window` people just
+    before them if given, and each trait is known with probability
+    `known`. Known traits are true or false with equal probability, or
+    drawn with genes from `model` if given.
+    """
+    rng = random.Random(seed)
+    people = {}
+    genes = {}
+    for i in range(n_people):
+        name = f"Person{i}"
+        mother = father = None
+        if i >= 2 and rng.random() < 2 / 3:
+            mother, father = rng.sample(list(people)[-(window or i):], 2)
+        if model is None:
+            trait = rng.choice([True, False])
+        else:
+            if mother is None:
+                weights = model.prior_list
+            else:
+                weights = model.inheritance_list[genes[mother]][genes[father]]
+            genes[name] = rng.choices(range(3), weights)[0]
+            trait = rng.random() < model.trait_list[genes[name]][True]
+        if rng.random() >= known:
+            trait = None
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": trait
+        }
+    return people
+
+
+def legacy_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    `joint_probability` as it was before the model was compiled into
+    tables: the probabilities are recomputed from PROBS for every
+    person of every assignment.
+    """
+    probability = 1.0
+
+    def pass_prob(parent):
+        if parent in two_genes:
+            return 1 - PROBS["mutation"]
+        elif parent in one_gene:
+            return 0.5
+        else:
+            return PROBS["mutation"]
+
+    for person in people:
+        if person in two_genes:
+            genes = 2
+        elif person in one_gene:
+            genes = 1
+        else:
+            genes = 0
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None and father is None:
+            gene_prob = PROBS["gene"][genes]
+        else:
+            pm = pass_prob(mother)
+            pf = pass_prob(father)
+            if genes == 2:
+                gene_prob = pm * pf
+            elif genes == 1:
+                gene_prob = pm * (1 - pf) + (1 - pm) * pf
+            else:
+                gene_prob = (1 - pm) * (1 - pf)
+        trait_prob = PROBS["trait"][genes][person in have_trait]
+        probability *= gene_prob * trait_prob
+    return probability
+
+
+def max_difference(probabilities, expected):
+    return max(
+        abs(probabilities[person][field][value]
+            - expected[person][field][value])
+        for person in expected
+        for field in expected[person]
+        for value in expected[person][field]
+    )
+
+
+def compare_engines(engines, args):
+    """
+    Times `engines` on random families of each size in `args.sizes`
+    against set enumeration, or against the junction tree engine on
+    families too large to enumerate.
+    """
+    print(f"{'people':>6}{'enumeration':>14}"
+          + "".join(f"{engine:>12}{'speedup':>10}" for engine in engines)
+          + f"{'max diff':>10}")
+    model = MODEL
+    for n_people in args.sizes:
+        people = random_family(n_people, args.seed)
+        if n_people <= args.enumeration_max:
+            start = time.perf_counter()
+            expected = ENGINES["enumeration"](people, model)
+            baseline = time.perf_counter() - start
+            line = f"{n_people:>6}{baseline:>13.4f}s"
+        else:
+            expected = ENGINES["elimination"](people, model)
+            baseline = None
+            line = f"{n_people:>6}{'-':>14}"
+        difference = 0.0
+        for engine in engines:
+            start = time.perf_counter()
+            probabilities = ENGINES[engine](people, model)
+            seconds = time.perf_counter() - start
+            difference = max(difference,
+                             max_difference(probabilities, expected))
+            line += f"{seconds:>11.4f}s"
+            if baseline is None:
+                line += f"{'-':>10}"
+            else:
+                line += f"{baseline / seconds:>9.0f}x"
+        print(f"{line}{difference:>10.1e}")
+
+
+def bench_bitmask(args):
+    compare_engines(["bitmask"], args)
+
+
+def bench_batched(args):
+    compare_engines(["bitmask", "batched"], args)
+
+
+def bench_sampling(args):
+    """
+    Times the sampling engines on large families whose parents are
+    close together, so that the junction tree engine gives the exact
+    distributions to compare with.
+    """
+    print(f"{'people':>6}{'engine':>12}{'seconds':>10}{'diagnostic':>22}"
+          f"{'mean error':>12}{'max error':>11}")
+    model = MODEL
+    for n_people in args.sizes:
+        people = random_family(n_people, args.seed, window=args.window,
+                               model=model)
+        start = time.perf_counter()
+        expected = ENGINES["elimination"](people, model)
+        print(f"{n_people:>6}{'elimination':>12}"
+              f"{time.perf_counter() - start:>9.3f}s")
+        for engine in ("likelihood", "gibbs"):
+            stats = {}
+            start = time.perf_counter()
+            probabilities = ENGINES[engine](
+                people, model, samples=args.samples, seed=args.seed,
+                workers=args.workers, stats=stats
+            )
+            seconds = time.perf_counter() - start
+            errors = [
+                abs(probabilities[person]["gene"][genes]
+                    - expected[person]["gene"][genes])
+                for person in people for genes in (0, 1, 2)
+            ]
+            if "r_hat" in stats:
+                diagnostic = f"R-hat {stats['r_hat']:.3f}"
+            else:
+                diagnostic = f"ESS {stats['effective_samples']:.1f}"
+            print(f"{n_people:>6}{engine:>12}{seconds:>9.3f}s"
+                  f"{diagnostic:>22}{sum(errors) / len(errors):>12.5f}"
+                  f"{max(errors):>11.4f}")
+
+
+def bench_model(args):
+    """
+    Times joint_probability with the model compiled into tables against
+    the legacy version over every gene assignment of random families,
+    and the junction tree engine with the model compiled once against
+    compiling it for every family.
+    """
+    print(f"{'people':>6}{'assignments':>13}{'legacy':>12}{'tables':>12}"
+          f"{'speedup':>9}")
+    model = MODEL
+    for n_people in args.sizes:
+        people = random_family(n_people, args.seed)
+        names = set(people)
+        have_trait = {name for name in people if people[name]["trait"]}
+        assignments = [
+            (one_gene, two_genes)
+            for one_gene in powerset(names)
+            for two_genes in powerset(names - one_gene)
+        ]
+        functions = (legacy_joint_probability,
+                     functools.partial(joint_probability, model=model))
+        timings = [float("inf")] * len(functions)
+        values = [None] * len(functions)
+        # Alternate between the functions, without garbage collection
+        # pauses, so that noise affects both alike
+        gc.disable()
+        try:
+            for _ in range(args.repeat):
+                for i, function in enumerate(functions):
+                    start = time.perf_counter()
+                    values[i] = [
+                        function(people, one_gene, two_genes, have_trait)
+                        for one_gene, two_genes in assignments
+                    ]
+                    timings[i] = min(timings[i],
+                                     time.perf_counter() - start)
+        finally:
+            gc.enable()
+        difference = max(abs(a - b) for a, b in zip(*values))
+        if difference > 1e-12:
+            print(f"joint probabilities differ by {difference:.2e}",
+                  file=sys.stderr)
+        print(f"{n_people:>6}{len(assignments):>13}{timings[0]:>11.3f}s"
+              f"{timings[1]:>11.3f}s{timings[0] / timings[1]:>8.1f}x")
+
+    families = [random_family(args.family_size, seed)
+                for seed in range(args.families)]
+    timings = []
+    for compile_each in (True, False):
+        start = time.perf_counter()
+        for people in families:
+            ENGINES["elimination"](
+                people, Model(PROBS) if compile_each else model
+            )
+        timings.append(time.perf_counter() - start)
+    print(f"{args.families} families of {args.family_size}, junction tree: "
+          f"{timings[0]:.3f}s compiling the model for each, "
+          f"{timings[1]:.3f}s compiled once")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heredity benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, description in (
+        ("bitmask", "bitmask enumeration against set enumeration"),
+        ("batched", "NumPy batched enumeration against the others"),
+    ):
+        command = commands.add_parser(name, help=description)
+        command.add_argument("--sizes", type=int, nargs="+",
+                             default=[3, 5, 6, 7, 12, 13, 14, 15],
+                             help="family sizes "
+                                  "(default: 3 5 6 7 12 13 14 15)")
+        command.add_argument("--enumeration-max", type=int, default=7,
+                             help="largest family to run set enumeration "
+                                  "on (default: 7)")
+        command.add_argument("--seed", type=int, default=0)
+    command = commands.add_parser(
+        "sampling", help="sampling engines against the junction tree"
+    )
+    command.add_argument("--sizes", type=int, nargs="+",
+                         default=[100, 1000, 5000],
+                         help="family sizes (default: 100 1000 5000)")
+    command.add_argument("--window", type=int, default=4,
+                         help="parents are among the people this close "
+                              "before a child (default: 4)")
+    command.add_argument("--samples", type=int, default=SAMPLES)
+    command.add_argument("--workers", type=int, default=1)
+    command.add_argument("--seed", type=int, default=0)
+    command = commands.add_parser(
+        "model", help="table lookups against recomputed probabilities"
+    )
+    command.add_argument("--sizes", type=int, nargs="+", default=[5, 7, 8],
+                         help="family sizes (default: 5 7 8)")
+    command.add_argument("--repeat", type=int, default=20,
+                         help="best of this many runs (default: 20)")
+    command.add_argument("--families", type=int, default=1000,
+                         help="families run by the junction tree "
+                              "(default: 1000)")
+    command.add_argument("--family-size", type=int, default=10,
+                         help="people per family run by the junction tree "
+                              "(default: 10)")
+    command.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "bitmask":
+        bench_bitmask(args)
+    elif args.command == "batched":
+        bench_batched(args)
+    elif args.command == "sampling":
+        bench_sampling(args)
+    elif args.command == "model":
+        bench_model(args)
+
+
+if __name__ == "__main__":
+    main()
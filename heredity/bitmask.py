@@ -0,0 +1,158 @@
+"""
+Exact heredity inference by enumerating gene assignments as bitmasks.
+
+Like the enumeration in heredity.py this sums the joint probability of
+every assignment, but:
+
+- Who has one or two copies of the gene is kept as two integers with one
+  bit per person rather than as sets, and assignments are generated one
+  at a time, depth first, instead of materializing every subset.
+- People are assigned parents first, so the factor of each person, P(genes
+  | parents' genes) times P(trait | genes) for a known trait, is looked
+  up in a table compiled once per person and multiplied into the
+  product of the people before it; a prefix whose product is 0 is
+  pruned along with every assignment extending it.
+- Known traits have a single consistent value, which is fixed. The
+  unknown traits of an assignment sum to 1, so they are not enumerated
+  at all; their distribution follows from the gene distribution.
+"""
+from collections import defaultdict
+
+
+def parents_first(people):
+    """
+    Returns the names of the people ordered so that parents come before
+    their children.
+    """
+    order = []
+    placed = set()
+
+    def place(name):
+        if name in placed:
+            return
+        placed.add(name)
+        for parent in (people[name]["mother"], people[name]["father"]):
+            if parent is not None:
+                place(parent)
+        order.append(name)
+
+    for name in people:
+        place(name)
+    return order
+
+
+def compile_tables(people, names, model):
+    """
+    Returns the positions in `names` of each person's mother and father,
+    or None for people without parents, and each person's factor table,
+    indexed [mother genes][father genes][genes] or [genes] without
+    parents.
+    """
+    position = {name: i for i, name in enumerate(names)}
+    parents = []
+    tables = []
+    for name in names:
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            parents.append(None)
+            table = [model.prior_list]
+        else:
+            parents.append((position[person["mother"]],
+                            position[person["father"]]))
+            table = [row for rows in model.inheritance_list for row in rows]
+        if person["trait"] is not None:
+            evidence = model.evidence(person["trait"]).tolist()
+            table = [[p * e for p, e in zip(row, evidence)]
+                     for row in table]
+        # Founders' tables are a single row; children's are indexed by
+        # 3 * mother genes + father genes
+        tables.append(table)
+    return parents, tables
+
+
+def assignments(parents, tables):
+    """
+    Yields (one_gene, two_genes, p) for every gene assignment of nonzero
+    probability, with one_gene and two_genes bitmasks over positions and
+    p the product of all factors.
+    """
+    n = len(tables)
+    if n == 0:
+        yield 0, 0, 1.0
+        return
+
+    # Depth-first over positions like an odometer: counts[i] is the gene
+    # count of position i, -1 before its first, and products[i + 1] the
+    # product of the factors of positions 0 to i
+    counts = [-1] * n
+    products = [1.0] * (n + 1)
+    one_gene = 0
+    two_genes = 0
+    i = 0
+    while i >= 0:
+        bit = 1 << i
+        one_gene &= ~bit
+        two_genes &= ~bit
+        genes = counts[i] + 1
+        if genes == 3:
+            counts[i] = -1
+            i -= 1
+            continue
+        counts[i] = genes
+        if parents[i] is None:
+            factor = tables[i][0][genes]
+        else:
+            mother, father = parents[i]
+            factor = tables[i][3 * counts[mother] + counts[father]][genes]
+        p = products[i] * factor
+        if p == 0:
+            continue
+        products[i + 1] = p
+        if genes == 1:
+            one_gene |= bit
+        elif genes == 2:
+            two_genes |= bit
+        if i == n - 1:
+            yield one_gene, two_genes, p
+        else:
+            i += 1
+
+
+def bits(mask):
+    """
+    Yields the positions of the set bits of `mask`.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def infer(people, model):
+    """
+    Returns the gene and trait distribution of each person given the
+    known traits, in the `probabilities` format of heredity.py.
+    """
+    names = parents_first(people)
+    parents, tables = compile_tables(people, names, model)
+    n = len(names)
+
+    # There are at most 2^n distinct masks against 3^n assignments, so
+    # sum the probabilities by mask and split masks into people after
+    by_one = defaultdict(float)
+    by_two = defaultdict(float)
+    for one_gene, two_genes, p in assignments(parents, tables):
+        by_one[one_gene] += p
+        by_two[two_genes] += p
+    total = sum(by_one.values())
+    one = [0.0] * n
+    two = [0.0] * n
+    for masks, sums in ((by_one, one), (by_two, two)):
+        for mask, p in masks.items():
+            for i in bits(mask):
+                sums[i] += p
+
+    genes = [[total - one[i] - two[i], one[i], two[i]] for i in range(n)]
+    if total > 0:
+        genes = [[p / total for p in row] for row in genes]
+    return model.probabilities(people, names, genes)
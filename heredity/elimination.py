@@ -0,0 +1,216 @@
+"""
+Exact heredity inference by junction tree propagation.
+
+The family is compiled into factors over the gene counts (0, 1 or 2) of
+its people: a prior for each person without parents, a 3x3x3
+child-given-parents table for everyone else, and for each known trait
+the probability of that trait given each gene count. Variables are
+eliminated in a greedy min-fill order; the cliques this creates form a
+junction tree, on which one upward and one downward pass of messages
+give the gene distribution of every person at once. Unknown traits
+follow from the gene distribution.
+
+Cliques in family trees hold a few people (a child and both parents,
+plus some fill-in where families intermarry), so the cost grows about
+linearly with the size of the family.
+"""
+import heapq
+
+import numpy as np
+
+# Factor of 1 for every gene count
+ONES = np.ones(3)
+
+
+def compile_factors(people, model):
+    """
+    Returns the names of the people, in order, and the factors of their
+    joint gene distribution given the known traits, as (scope, table)
+    pairs with scope a tuple of person numbers.
+    """
+    names = list(people)
+    number = {name: i for i, name in enumerate(names)}
+
+    factors = []
+    for i, name in enumerate(names):
+        person = people[name]
+        if person["mother"] is None and person["father"] is None:
+            scope = (i,)
+            table = model.prior
+        else:
+            scope = (number[person["mother"]], number[person["father"]], i)
+            table = model.inheritance
+        factors.append((scope, table * model.evidence(person["trait"])))
+    return names, factors
+
+
+def elimination_order(n_variables, scopes):
+    """
+    Returns an elimination order of the variables of factors with the
+    given scopes, chosen greedily by fewest fill-in edges, ties broken
+    by fewest neighbors, and the neighbors each variable has when it is
+    eliminated.
+    """
+    neighbors = [set() for _ in range(n_variables)]
+    for scope in scopes:
+        for variable in scope:
+            neighbors[variable].update(scope)
+            neighbors[variable].discard(variable)
+
+    def cost(variable):
+        around = list(neighbors[variable])
+        fill = sum(
+            1 for i, a in enumerate(around) for b in around[i + 1:]
+            if b not in neighbors[a]
+        )
+        return fill, len(around), variable
+
+    # Eliminating a variable only changes the costs of variables at most
+    # two links away from it, so the others keep their heap entries;
+    # entries that no longer match the current cost are skipped
+    costs = [cost(variable) for variable in range(n_variables)]
+    heap = list(costs)
+    heapq.heapify(heap)
+    eliminated = [False] * n_variables
+    order = []
+    cliques = []
+    while heap:
+        entry = heapq.heappop(heap)
+        variable = entry[2]
+        if eliminated[variable] or entry != costs[variable]:
+            continue
+        around = neighbors[variable]
+        for a in around:
+            neighbors[a].update(around)
+            neighbors[a].discard(a)
+            neighbors[a].discard(variable)
+        eliminated[variable] = True
+        order.append(variable)
+        cliques.append((variable, *sorted(around)))
+        changed = set(around)
+        for a in around:
+            changed.update(neighbors[a])
+        for a in changed:
+            costs[a] = cost(a)
+            heapq.heappush(heap, costs[a])
+    return order, cliques
+
+
+class JunctionTree():
+    """
+    The cliques of an elimination order, joined into a tree, with each
+    factor assigned to a clique containing its scope. The tree depends
+    only on the scopes of the factors, so it can be reused for any
+    tables over the same scopes.
+    """
+
+    def __init__(self, n_variables, scopes):
+        order, cliques = elimination_order(n_variables, scopes)
+        position = {variable: i for i, variable in enumerate(order)}
+        self.cliques = cliques
+        self.scopes = scopes
+        # The clique of a variable joins the clique of its neighbor
+        # eliminated next
+        self.parent = [
+            min((position[v] for v in clique[1:]), default=None)
+            for clique in cliques
+        ]
+        self.children = [[] for _ in cliques]
+        for i, parent in enumerate(self.parent):
+            if parent is not None:
+                self.children[parent].append(i)
+        self.factors = [[] for _ in cliques]
+        for factor, scope in enumerate(scopes):
+            first = min(position[variable] for variable in scope)
+            self.factors[first].append(factor)
+        # einsum takes few distinct labels, so number the variables
+        # within each clique
+        self.labels = [{variable: i for i, variable in enumerate(clique)}
+                       for clique in cliques]
+
+    def contract(self, clique, tables, messages, output):
+        """
+        Multiplies a clique's factor tables with the given messages and
+        sums out all variables but those of `output`.
+        """
+        # A vector of ones per variable keeps each in the product even
+        # if no factor mentions it
+        label = self.labels[clique]
+        operands = []
+        for i in range(len(label)):
+            operands += [ONES, [i]]
+        for factor in self.factors[clique]:
+            scope = self.scopes[factor]
+            operands += [tables[factor],
+                         [label[variable] for variable in scope]]
+        for scope, table in messages:
+            operands += [table, [label[variable] for variable in scope]]
+        return normalized(np.einsum(
+            *operands, [label[variable] for variable in output]
+        ))
+
+    def separator(self, clique):
+        return sorted(set(self.cliques[clique])
+                      & set(self.cliques[self.parent[clique]]))
+
+    def marginals(self, tables):
+        """
+        Returns the normalized distribution of every variable given the
+        factor tables, one per scope, as an array with one row per
+        variable.
+        """
+        n_cliques = len(self.cliques)
+        up = [None] * n_cliques
+        down = [None] * n_cliques
+
+        # Cliques come in elimination order, so children come first
+        for clique in range(n_cliques):
+            if self.parent[clique] is None:
+                continue
+            separator = self.separator(clique)
+            messages = [up[child] for child in self.children[clique]]
+            up[clique] = (separator,
+                          self.contract(clique, tables, messages,
+                                        separator))
+
+        marginals = np.empty((n_cliques, 3))
+        for clique in reversed(range(n_cliques)):
+            messages = [up[child] for child in self.children[clique]]
+            if down[clique] is not None:
+                messages.append(down[clique])
+            variable = self.cliques[clique][0]
+            marginals[variable] = self.contract(clique, tables, messages,
+                                                [variable])
+            for child in self.children[clique]:
+                separator = up[child][0]
+                others = [up[sibling] for sibling in self.children[clique]
+                          if sibling != child]
+                if down[clique] is not None:
+                    others.append(down[clique])
+                down[child] = (separator,
+                               self.contract(clique, tables, others,
+                                             separator))
+        return marginals
+
+
+def normalized(table):
+    """
+    Returns a table scaled to sum to 1, so long messages cannot
+    underflow.
+    """
+    total = table.sum()
+    return table / total if total > 0 else table
+
+
+def infer(people, model, tree=None):
+    """
+    Returns the gene and trait distribution of each person given the
+    known traits, in the `probabilities` format of heredity.py. A
+    JunctionTree built for a family of the same shape, with the same
+    parents at the same positions, can be passed as `tree`.
+    """
+    names, factors = compile_factors(people, model)
+    if tree is None:
+        tree = JunctionTree(len(names), [scope for scope, _ in factors])
+    genes = tree.marginals([table for _, table in factors])
+    return model.probabilities(people, names, genes)
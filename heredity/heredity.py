@@ -1,7 +1,18 @@
+"""
+Usage: python heredity.py data.csv [--engine ENGINE] [--model FILE]
+                          [--samples N] [--seed N] [--workers N]
+"""
+import argparse
 import csv
 import itertools
 import sys
 
+import batched
+import bitmask
+import elimination
+import sampling
+from model import Model, load_model
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -36,14 +47,65 @@ PROBS = {
     "mutation": 0.01
 }
 
+# PROBS compiled into lookup tables once, at import; to use other
+# parameters, pass the engines a Model of them instead of changing PROBS
+MODEL = Model(PROBS)
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Gene and trait "
+                                                 "probabilities of a family.")
+    parser.add_argument("data", help="CSV of name, mother, father, trait")
+    parser.add_argument("--engine", choices=ENGINES, default="enumeration",
+                        help="inference engine (default: enumeration)")
+    parser.add_argument("--model", metavar="FILE",
+                        help="JSON file of model parameters "
+                             "(default: PROBS)")
+    parser.add_argument("--samples", type=int, default=sampling.SAMPLES,
+                        help="samples drawn by the sampling engines "
+                             f"(default: {sampling.SAMPLES})")
+    parser.add_argument("--seed", type=int,
+                        help="random seed of the sampling engines")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes of the sampling engines "
+                             "(default: 1)")
+    args = parser.parse_args()
+    people = load_data(args.data)
+    model = MODEL
+    if args.model is not None:
+        try:
+            model = load_model(args.model)
+        except (OSError, ValueError) as error:
+            sys.exit(f"Could not load model: {error}")
+
+    if args.engine in SAMPLERS:
+        stats = {}
+        probabilities = ENGINES[args.engine](
+            people, model, samples=args.samples, seed=args.seed,
+            workers=args.workers, stats=stats
+        )
+        print(", ".join(f"{key}: {value:g}"
+                        for key, value in stats.items()), file=sys.stderr)
+    else:
+        probabilities = ENGINES[args.engine](people, model)
 
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_all(people, model=MODEL):
+    """
+    Return the gene and trait distribution of each person by summing
+    the joint probability of every assignment of genes and traits.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -71,20 +133,13 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+                p = joint_probability(people, one_gene, two_genes,
+                                      have_trait, model)
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -121,51 +176,33 @@ def powerset(s):
     ]
 
 
-def joint_probability(people, one_gene, two_genes, have_trait):
+def joint_probability(people, one_gene, two_genes, have_trait,
+                      model=MODEL):
     """
     Compute and return a joint probability.
     """
+    founder = model.founder_list
+    child = model.child_list
+
+    # Gene count of every person, looked up once per parent and child;
+    # a missing parent counts as having no copies
+    genes = dict.fromkeys(people, 0)
+    genes[None] = 0
+    for person in one_gene:
+        genes[person] = 1
+    for person in two_genes:
+        genes[person] = 2
+
+    # Multiply in each person's gene and trait probability
     probability = 1.0
-
-    # Helper to compute probability parent passes gene
-    def pass_prob(parent):
-        if parent in two_genes:
-            return 1 - PROBS["mutation"]
-        elif parent in one_gene:
-            return 0.5
-        else:
-            return PROBS["mutation"]
-
-    for person in people:
-        # Determine gene count
-        if person in two_genes:
-            genes = 2
-        elif person in one_gene:
-            genes = 1
-        else:
-            genes = 0
-
-        # Compute gene probability
-        mother = people[person]["mother"]
-        father = people[person]["father"]
+    for person, row in people.items():
+        mother = row["mother"]
+        father = row["father"]
         if mother is None and father is None:
-            gene_prob = PROBS["gene"][genes]
+            probability *= founder[genes[person]][person in have_trait]
         else:
-            pm = pass_prob(mother)
-            pf = pass_prob(father)
-            if genes == 2:
-                gene_prob = pm * pf
-            elif genes == 1:
-                gene_prob = pm * (1 - pf) + (1 - pm) * pf
-            else:
-                gene_prob = (1 - pm) * (1 - pf)
-
-        # Compute trait probability
-        has_trait = person in have_trait
-        trait_prob = PROBS["trait"][genes][has_trait]
-
-        # Multiply into joint probability
-        probability *= gene_prob * trait_prob
+            probability *= child[genes[mother]][genes[father]][
+                genes[person]][person in have_trait]
 
     return probability
 
@@ -208,5 +245,20 @@ def normalize(probabilities):
                 trait_dist[t] /= total_traits
 
 
+# Inference engines, each taking a family and a Model and returning the
+# `probabilities` of the family
+ENGINES = {
+    "enumeration": enumerate_all,
+    "bitmask": bitmask.infer,
+    "batched": batched.infer,
+    "elimination": elimination.infer,
+    "likelihood": sampling.likelihood_weighting,
+    "gibbs": sampling.gibbs,
+}
+
+# Engines that estimate by sampling and take sampling options
+SAMPLERS = ("likelihood", "gibbs")
+
+
 if __name__ == "__main__":
     main()
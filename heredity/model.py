@@ -0,0 +1,131 @@
+"""
+The heredity model, compiled into lookup tables shared by every
+inference engine.
+
+A model file is JSON in the layout of PROBS in heredity.py:
+
+    {
+        "gene": {"2": 0.01, "1": 0.03, "0": 0.96},
+        "trait": {
+            "2": {"true": 0.65, "false": 0.35},
+            "1": {"true": 0.56, "false": 0.44},
+            "0": {"true": 0.01, "false": 0.99}
+        },
+        "mutation": 0.01
+    }
+"""
+import json
+
+import numpy as np
+
+GENES = (2, 1, 0)
+
+# How far a distribution may sum from 1
+TOLERANCE = 1e-6
+
+
+def inheritance_table(mutation):
+    """
+    Returns the table P(child genes | mother genes, father genes) as a
+    3x3x3 array indexed by gene counts.
+    """
+    # Probability that a parent with 0, 1 or 2 copies passes the gene on
+    passing = np.array([mutation, 0.5, 1 - mutation])
+    mother = passing[:, None]
+    father = passing[None, :]
+    table = np.empty((3, 3, 3))
+    table[:, :, 0] = (1 - mother) * (1 - father)
+    table[:, :, 1] = mother * (1 - father) + (1 - mother) * father
+    table[:, :, 2] = mother * father
+    return table
+
+
+class Model():
+    """
+    Model parameters in the format of PROBS, compiled into the gene
+    prior, the child-given-parents table and the trait table
+    P(trait | genes), indexed [genes, has trait], and into their
+    products: the factor of a person without parents, indexed
+    [genes, has trait], and of a child, indexed [mother genes, father
+    genes, genes, has trait]. Each is kept both as a NumPy array and as
+    nested lists, which are faster to index from Python loops.
+    """
+
+    def __init__(self, probs):
+        self.probs = probs
+        self.prior = np.array([probs["gene"][genes] for genes in range(3)])
+        self.inheritance = inheritance_table(probs["mutation"])
+        self.trait = np.array([
+            [probs["trait"][genes][False], probs["trait"][genes][True]]
+            for genes in range(3)
+        ])
+        self.founder = self.prior[:, None] * self.trait
+        self.child = self.inheritance[:, :, :, None] * self.trait
+        self.prior_list = self.prior.tolist()
+        self.inheritance_list = self.inheritance.tolist()
+        self.trait_list = self.trait.tolist()
+        self.founder_list = self.founder.tolist()
+        self.child_list = self.child.tolist()
+
+    def evidence(self, trait):
+        """
+        Returns P(trait | genes) for a known trait, or ones for an
+        unknown trait, as an array indexed by gene count.
+        """
+        if trait is None:
+            return np.ones(3)
+        return self.trait[:, int(trait)]
+
+    def probabilities(self, people, names, genes):
+        """
+        Returns the `probabilities` of heredity.py, in the order of
+        `people`, given the distribution of gene counts of each person
+        of `names` as the rows of `genes`. Unknown traits follow from
+        the gene distribution.
+        """
+        genes = np.asarray(genes, dtype=np.float64).reshape(-1, 3)
+        has_trait = genes @ self.trait[:, 1]
+        position = {name: i for i, name in enumerate(names)}
+        result = {}
+        for name in people:
+            i = position[name]
+            trait = people[name]["trait"]
+            p = float(has_trait[i]) if trait is None else float(trait)
+            result[name] = {
+                "gene": {count: float(genes[i, count]) for count in GENES},
+                "trait": {True: p, False: 1 - p}
+            }
+        return result
+
+
+def load_model(path):
+    """
+    Returns the Model in the JSON file at `path`.
+    Raises ValueError if the file does not describe a valid model.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    try:
+        probs = {
+            "gene": {genes: float(data["gene"][str(genes)])
+                     for genes in range(3)},
+            "trait": {
+                genes: {
+                    True: float(data["trait"][str(genes)]["true"]),
+                    False: float(data["trait"][str(genes)]["false"])
+                }
+                for genes in range(3)
+            },
+            "mutation": float(data["mutation"])
+        }
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"{path}: malformed model: {error!r}")
+    distributions = [probs["gene"]] + list(probs["trait"].values())
+    for distribution in distributions:
+        values = list(distribution.values())
+        if min(values) < 0 or abs(sum(values) - 1) > TOLERANCE:
+            raise ValueError(f"{path}: probabilities must be nonnegative "
+                             f"and sum to 1: {distribution}")
+    if not 0 <= probs["mutation"] <= 1:
+        raise ValueError(f"{path}: mutation must be between 0 and 1")
+    return Model(probs)
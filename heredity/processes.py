@@ -0,0 +1,17 @@
+"""
+Process pool helper shared by the heredity scripts.
+"""
+import multiprocessing
+
+
+def fork_pool(processes, initializer=None, initargs=()):
+    """
+    Returns a pool of `processes` workers, forked where the platform
+    allows so that they inherit the parent's data instead of each
+    loading or unpickling their own copy.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "fork" if "fork" in methods else None
+    )
+    return context.Pool(processes, initializer, initargs)
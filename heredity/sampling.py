@@ -0,0 +1,384 @@
+"""
+Approximate heredity inference by sampling, for families of thousands
+of people where exact inference is not needed.
+
+Likelihood weighting draws gene counts for everyone, parents before
+children, from the priors and the child-given-parents table, and
+weights each sample by the probability of the known traits given its
+genes. People of the same generation are drawn together, as NumPy
+arrays over a batch of samples. Its diagnostic is the effective sample
+size: when many traits are known, a few samples carry most of the
+weight.
+
+The Gibbs sampler starts each chain from a forward sample and redraws
+every person's gene count from its distribution given everyone else's:
+the person's own factor, the factors of their children, and the
+evidence of a known trait. People who share no factor are independent
+given everyone else, so the people are colored such that no two of a
+color share a factor, and each color is redrawn at once, for all chains
+together. Instead of counting the drawn gene counts, the distributions
+they are drawn from are averaged, which gives the same estimate with
+less noise. Its diagnostic is the largest potential scale reduction
+factor (R-hat) over people's expected gene counts across chains:
+values near 1 mean the chains agree.
+
+Both split their work over worker processes with independent random
+streams spawned from one seed. Unknown traits follow from the gene
+distribution, as in the exact engines.
+"""
+import numpy as np
+
+from bitmask import parents_first
+from processes import fork_pool
+
+# Samples drawn by likelihood weighting, or kept over all Gibbs chains
+SAMPLES = 10000
+
+# Gibbs sweeps per chain before samples are kept
+BURN_IN = 100
+
+# Gibbs chains, run together
+CHAINS = 4
+
+# Likelihood weighting samples drawn together
+BATCH_SIZE = 1024
+
+# Pedigree used by worker processes, inherited on fork or pickled on
+# spawn
+shared_pedigree = None
+
+
+class Pedigree():
+    """
+    A family compiled for sampling, with people numbered parents first.
+    """
+
+    def __init__(self, people, model):
+        self.names = parents_first(people)
+        position = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.mothers = np.full(n, -1)
+        self.fathers = np.full(n, -1)
+        self.evidence = np.ones((n, 3))
+        for i, name in enumerate(self.names):
+            person = people[name]
+            if person["mother"] is not None:
+                self.mothers[i] = position[person["mother"]]
+                self.fathers[i] = position[person["father"]]
+            self.evidence[i] = model.evidence(person["trait"])
+        self.prior = model.prior
+        self.inheritance = model.inheritance
+        with np.errstate(divide="ignore"):
+            self.log_prior = np.log(self.prior)
+            self.log_inheritance = np.log(self.inheritance)
+            self.log_evidence = np.log(self.evidence)
+        # Gibbs works on planes of one gene count each, so these tables
+        # have gene counts first: the evidence by person, the child
+        # genes of the child-given-parents table by 3 * mother genes +
+        # father genes, and a parent's genes by 3 * other parent's genes
+        # + child genes (the table is symmetric in the parents)
+        self.evidence_planes = np.ascontiguousarray(self.log_evidence.T)
+        self.by_parents = np.ascontiguousarray(
+            self.log_inheritance.reshape(9, 3).T
+        )
+        self.by_child = self.log_inheritance.reshape(3, 9)
+
+        # Generations, so that a generation's parents are all drawn
+        # before it
+        level = np.zeros(n, dtype=np.int64)
+        for i in range(n):
+            if self.mothers[i] >= 0:
+                level[i] = 1 + max(level[self.mothers[i]],
+                                   level[self.fathers[i]])
+        self.generations = [np.flatnonzero(level == g)
+                            for g in range(int(level.max()) + 1 if n else 0)]
+        self.colors = [Color(self, color) for color in self.coloring()]
+
+    def __len__(self):
+        return len(self.names)
+
+    def coloring(self):
+        """
+        Returns lists of people such that no two people in a list share
+        a factor, colored greedily.
+        """
+        n = len(self)
+        neighbors = [set() for _ in range(n)]
+        for child in range(n):
+            mother, father = self.mothers[child], self.fathers[child]
+            if mother < 0:
+                continue
+            family = (child, mother, father)
+            for a in family:
+                neighbors[a].update(family)
+        colors = []
+        color = [-1] * n
+        for i in range(n):
+            taken = {color[a] for a in neighbors[i] if a != i}
+            color[i] = next(c for c in range(len(colors) + 1)
+                            if c not in taken)
+            if color[i] == len(colors):
+                colors.append([])
+            colors[color[i]].append(i)
+        return colors
+
+    def forward(self, n_samples, rng):
+        """
+        Returns `n_samples` gene assignments drawn from the priors and
+        the child-given-parents table, ignoring the evidence, as an
+        array with one row per sample.
+        """
+        genes = np.zeros((n_samples, len(self)), dtype=np.intp)
+        prior = np.cumsum(self.prior)[:2]
+        inheritance = np.cumsum(self.inheritance, axis=-1)[..., :2]
+        for generation in self.generations:
+            u = rng.random((n_samples, len(generation), 1))
+            mothers = self.mothers[generation]
+            if mothers[0] < 0:
+                cumulative = prior
+            else:
+                cumulative = inheritance[genes[:, mothers],
+                                         genes[:, self.fathers[generation]]]
+            genes[:, generation] = (u >= cumulative).sum(axis=-1)
+        return genes
+
+
+class Color():
+    """
+    The people of one color, with everything needed to redraw them.
+    """
+
+    def __init__(self, pedigree, people):
+        self.people = np.array(people, dtype=np.intp)
+        founder = pedigree.mothers[self.people] < 0
+        self.founders = np.flatnonzero(founder)
+        self.children = np.flatnonzero(~founder)
+        self.mothers = pedigree.mothers[self.people[self.children]]
+        self.fathers = pedigree.fathers[self.people[self.children]]
+
+        # One link per child of each person of the color: the position
+        # of the person in the color, the child and the other parent
+        position = {person: j for j, person in enumerate(people)}
+        links = []
+        for child in range(len(pedigree)):
+            for parent, other in ((pedigree.mothers[child],
+                                   pedigree.fathers[child]),
+                                  (pedigree.fathers[child],
+                                   pedigree.mothers[child])):
+                if parent in position:
+                    links.append((position[parent], child, other))
+        links = np.array(links, dtype=np.intp).reshape(-1, 3)
+        self.parents, self.groups = np.unique(links[:, 0],
+                                              return_inverse=True)
+        self.linked_children = links[:, 1]
+        self.others = links[:, 2]
+
+    def redraw(self, pedigree, genes, rng):
+        """
+        Redraws the gene counts of the people of this color for every
+        chain in `genes`, in place. Returns the distributions they were
+        drawn from, indexed [genes, chain, person of the color].
+        """
+        n_chains = len(genes)
+        logits = np.repeat(pedigree.evidence_planes[:, None, self.people],
+                           n_chains, axis=1)
+        logits[:, :, self.founders] += pedigree.log_prior[:, None, None]
+        logits[:, :, self.children] += pedigree.by_parents.take(
+            3 * genes[:, self.mothers] + genes[:, self.fathers], axis=1
+        )
+        if len(self.parents):
+            # Sum the factors of each person's children with a single
+            # bincount over (plane, chain, person) bins
+            factors = pedigree.by_child.take(
+                3 * genes[:, self.others] + genes[:, self.linked_children],
+                axis=1
+            )
+            n_parents = len(self.parents)
+            bins = (np.arange(3 * n_chains)[:, None] * n_parents
+                    + self.groups).ravel()
+            logits[:, :, self.parents] += np.bincount(
+                bins, weights=factors.ravel(),
+                minlength=3 * n_chains * n_parents
+            ).reshape(3, n_chains, n_parents)
+
+        # The gene axis has only three entries, so reduce it by hand
+        logits -= np.maximum(np.maximum(logits[0], logits[1]), logits[2])
+        distributions = np.exp(logits)
+        distributions /= distributions[0] + distributions[1] + distributions[2]
+        u = rng.random((n_chains, len(self.people)))
+        genes[:, self.people] = ((u >= distributions[0]).astype(np.intp)
+                                 + (u >= distributions[0] + distributions[1]))
+        return distributions
+
+
+def weigh(pedigree, n_samples, seed=None):
+    """
+    Draws `n_samples` by likelihood weighting. Returns the log of the
+    scale of the weights, and the scaled sums of the weights by person
+    and gene count, of the weights, and of their squares.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pedigree)
+    people = np.arange(n)
+    shift = -np.inf
+    sums = np.zeros((n, 3))
+    total = 0.0
+    squares = 0.0
+    for start in range(0, n_samples, BATCH_SIZE):
+        genes = pedigree.forward(min(BATCH_SIZE, n_samples - start), rng)
+        log_weights = pedigree.log_evidence[people, genes].sum(axis=1)
+        batch_shift = log_weights.max()
+        if batch_shift == -np.inf:
+            continue
+        if batch_shift > shift:
+            scale = np.exp(shift - batch_shift)
+            sums *= scale
+            total *= scale
+            squares *= scale ** 2
+            shift = batch_shift
+        weights = np.exp(log_weights - shift)
+        for count in range(3):
+            sums[:, count] += weights @ (genes == count)
+        total += weights.sum()
+        squares += (weights ** 2).sum()
+    return shift, sums, total, squares
+
+
+def sweep(pedigree, n_chains, samples, burn_in, seed=None):
+    """
+    Runs `n_chains` Gibbs chains for `burn_in` sweeps and then `samples`
+    kept sweeps. Returns the sums by person and gene count of the
+    distributions drawn from, over chains and kept sweeps, and per chain
+    and person the sum and sum of squares of the expected gene count.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pedigree)
+    genes = pedigree.forward(n_chains, rng)
+    sums = np.zeros((n, 3))
+    means = np.zeros((n_chains, n))
+    squares = np.zeros((n_chains, n))
+    expected = np.zeros((n_chains, n))
+    for iteration in range(burn_in + samples):
+        for color in pedigree.colors:
+            distributions = color.redraw(pedigree, genes, rng)
+            if iteration < burn_in:
+                continue
+            sums[color.people] += distributions.sum(axis=1).T
+            expected[:, color.people] = (distributions[1]
+                                         + 2 * distributions[2])
+        if iteration >= burn_in:
+            means += expected
+            squares += expected ** 2
+    return sums, means, squares
+
+
+def weigh_task(task):
+    return weigh(shared_pedigree, *task)
+
+
+def sweep_task(task):
+    return sweep(shared_pedigree, *task)
+
+
+def run(pedigree, function, tasks):
+    """
+    Returns the results of `function` on each task, run in a pool of
+    one process per task if there is more than one.
+    """
+    if len(tasks) == 1:
+        global shared_pedigree
+        shared_pedigree = pedigree
+        try:
+            return [function(tasks[0])]
+        finally:
+            shared_pedigree = None
+
+    with fork_pool(len(tasks), init_worker, (pedigree,)) as pool:
+        return pool.map(function, tasks)
+
+
+def init_worker(pedigree):
+    global shared_pedigree
+    shared_pedigree = pedigree
+
+
+def likelihood_weighting(people, model, samples=SAMPLES, workers=1,
+                         seed=None, stats=None):
+    """
+    Returns the gene and trait distribution of each person given the
+    known traits, estimated from `samples` weighted samples split over
+    `workers` processes, in the `probabilities` format of heredity.py.
+
+    If `stats` is a dictionary, the number of samples and the effective
+    sample size are recorded in it.
+    """
+    pedigree = Pedigree(people, model)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    tasks = [(samples // workers + (i < samples % workers), seeds[i])
+             for i in range(workers)]
+    results = run(pedigree, weigh_task, tasks)
+
+    shift = max(result[0] for result in results)
+    sums = np.zeros((len(pedigree), 3))
+    total = 0.0
+    squares = 0.0
+    if shift > -np.inf:
+        for result_shift, result_sums, result_total, result_squares \
+                in results:
+            scale = np.exp(result_shift - shift)
+            sums += scale * result_sums
+            total += scale * result_total
+            squares += scale ** 2 * result_squares
+    if total > 0:
+        sums /= total
+    if stats is not None:
+        stats["samples"] = samples
+        stats["effective_samples"] = (total ** 2 / squares if squares
+                                    else 0.0)
+    return model.probabilities(people, pedigree.names, sums)
+
+
+def gibbs(people, model, samples=SAMPLES, burn_in=BURN_IN, chains=CHAINS,
+          workers=1, seed=None, stats=None):
+    """
+    Returns the gene and trait distribution of each person given the
+    known traits, estimated by Gibbs sampling with `samples` kept sweeps
+    split over `chains` chains, after `burn_in` sweeps of each, in the
+    `probabilities` format of heredity.py. The chains are split over
+    `workers` processes.
+
+    If `stats` is a dictionary, the number of samples and the largest
+    R-hat over people are recorded in it.
+    """
+    pedigree = Pedigree(people, model)
+    chains = max(chains, workers)
+    kept = max(samples // chains, 2)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    tasks = [(chains // workers + (i < chains % workers), kept, burn_in,
+              seeds[i]) for i in range(workers)]
+    results = run(pedigree, sweep_task, tasks)
+
+    sums = sum(result[0] for result in results) / (kept * chains)
+    means = np.concatenate([result[1] for result in results]) / kept
+    squares = np.concatenate([result[2] for result in results]) / kept
+    if stats is not None:
+        stats["samples"] = kept * chains
+        stats["r_hat"] = r_hat(means, squares, kept)
+    return model.probabilities(people, pedigree.names, sums)
+
+
+def r_hat(means, squares, n):
+    """
+    Returns the largest potential scale reduction factor over people,
+    given per chain and person the mean and mean square of a quantity
+    over `n` samples, or nan with fewer than two chains.
+    """
+    if len(means) < 2 or not means.size:
+        return float("nan")
+    within = ((squares - means ** 2) * n / (n - 1)).mean(axis=0)
+    between = means.var(axis=0, ddof=1)
+    varying = within > 0
+    if not varying.any():
+        return 1.0
+    pooled = (n - 1) / n * within[varying] + between[varying]
+    return float(np.sqrt(pooled / within[varying]).max())
@@ -0,0 +1,221 @@
+"""
+Benchmarks for the knights project.
+
+Usage: python benchmark.py sat [--sizes N ...] [--enumeration-max N]
+       python benchmark.py truthtable [--sizes N ...] [--enumeration-max N]
+       python benchmark.py interning [--characters N] [--puzzles N]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from logic import (And, Implication, Not, Or, Symbol, model_check,
+                   model_check_enumeration)
+from truthtable import entailed, model_check_truthtable
+
+
+def random_puzzle(n_characters, seed=None):
+    """
+    Returns the symbols and knowledge of a random knights and knaves
+    puzzle in the style of puzzle.py: each of `n_characters` characters
+    is a knight or a knave and says something about one or two others,
+    true if a knight and false if a knave, so the puzzle has a solution.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(n_characters)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(n_characters)]
+    solution = [rng.random() < 0.5 for _ in range(n_characters)]
+
+    def statement(i):
+        """
+        Returns a random statement about characters other than i and
+        whether it holds in the solution.
+        """
+        def other():
+            if n_characters == 1:
+                return i
+            j = rng.randrange(n_characters - 1)
+            return j + 1 if j >= i else j
+
+        x = other()
+        y = other()
+        kind = rng.randrange(4)
+        if kind == 0:
+            return knights[x], solution[x]
+        if kind == 1:
+            return knaves[x], not solution[x]
+        if kind == 2:
+            return (Or(And(knights[x], knights[y]),
+                       And(knaves[x], knaves[y])),
+                    solution[x] == solution[y])
+        return (Implication(knights[x], knaves[y]),
+                not solution[x] or not solution[y])
+
+    knowledge = []
+    for i in range(n_characters):
+        knowledge.append(Or(knights[i], knaves[i]))
+        knowledge.append(Not(And(knights[i], knaves[i])))
+        said = None
+        while said is None:
+            sentence, holds = statement(i)
+            if holds == solution[i]:
+                said = sentence
+        knowledge.append(Implication(knights[i], said))
+        knowledge.append(Implication(knaves[i], Not(said)))
+    return knights + knaves, And(*knowledge)
+
+
+def bench_sat(args):
+    """
+    Times entailment of every symbol of random puzzles by the SAT
+    backend, and by enumeration for small puzzles, checking that both
+    agree.
+    """
+    print(f"{'symbols':>8}{'queries':>9}{'enumeration':>13}{'sat':>11}"
+          f"{'per query':>11}{'entailed':>10}")
+    for n_characters in args.sizes:
+        symbols, knowledge = random_puzzle(n_characters, args.seed)
+        start = time.perf_counter()
+        entailed = [model_check(knowledge, symbol) for symbol in symbols]
+        elapsed = time.perf_counter() - start
+        enumeration = "-"
+        if len(symbols) <= args.enumeration_max:
+            start = time.perf_counter()
+            expected = [model_check_enumeration(knowledge, symbol)
+                        for symbol in symbols]
+            enumeration = f"{time.perf_counter() - start:.3f}s"
+            if expected != entailed:
+                raise AssertionError(f"{len(symbols)} symbols: the SAT "
+                                     "backend disagrees with enumeration")
+        print(f"{len(symbols):>8}{len(symbols):>9}{enumeration:>13}"
+              f"{elapsed:>10.3f}s"
+              f"{1000 * elapsed / len(symbols):>9.2f}ms"
+              f"{sum(entailed):>10}")
+
+
+def bench_truthtable(args):
+    """
+    Times entailment of every symbol of random puzzles by enumeration,
+    by truth-table kernels one query at a time and all queries in one
+    pass, and by the SAT backend, checking that all agree.
+    """
+    print(f"{'symbols':>8}{'enumeration':>13}{'kernel':>10}"
+          f"{'one pass':>10}{'sat':>10}{'speedup':>9}")
+    for n_characters in args.sizes:
+        symbols, knowledge = random_puzzle(n_characters, args.seed)
+        timings = {}
+        results = {}
+        methods = [
+            ("kernel", lambda: [model_check_truthtable(knowledge, symbol)
+                                for symbol in symbols]),
+            ("one pass", lambda: entailed(knowledge, symbols)),
+            ("sat", lambda: [model_check(knowledge, symbol)
+                             for symbol in symbols])
+        ]
+        if len(symbols) <= args.enumeration_max:
+            methods.insert(0, (
+                "enumeration",
+                lambda: [model_check_enumeration(knowledge, symbol)
+                         for symbol in symbols]
+            ))
+        for name, method in methods:
+            start = time.perf_counter()
+            results[name] = method()
+            timings[name] = time.perf_counter() - start
+        if any(result != results["sat"] for result in results.values()):
+            raise AssertionError(f"{len(symbols)} symbols: the backends "
+                                 "disagree")
+        cells = [f"{timings[name]:.3f}s" if name in timings else "-"
+                 for name in ("enumeration", "kernel", "one pass", "sat")]
+        speedup = (f"{timings['enumeration'] / timings['kernel']:.0f}x"
+                   if "enumeration" in timings else "-")
+        print(f"{len(symbols):>8}{cells[0]:>13}{cells[1]:>10}"
+              f"{cells[2]:>10}{cells[3]:>10}{speedup:>9}")
+
+
+def bench_interning(args):
+    """
+    Measures the time and memory to build many puzzles over the same
+    characters, as puzzle.py does, and to build them again while the
+    first ones are still held, and the time to hash, compare, and take
+    the symbols and formula of their conjunction repeatedly.
+    """
+    builds = []
+    gc.collect()
+    tracemalloc.start()
+    for name in ("built", "rebuilt"):
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        builds.append(And(*[random_puzzle(args.characters, seed)[1]
+                            for seed in range(args.puzzles)]))
+        elapsed = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0] - before
+        print(f"{name:>8}: {elapsed:.3f}s, {memory / 2 ** 20:.1f} MiB")
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Without sharing, the second build would take as much as the first
+    print(f"{'held':>8}: {held / 2 ** 20:.1f} MiB for both builds")
+    knowledge, again = builds
+
+    for name, operation in (
+        ("hash", lambda: hash(knowledge)),
+        ("equal", lambda: knowledge == again),
+        ("symbols", knowledge.symbols),
+        ("formula", knowledge.formula)
+    ):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            operation()
+        seconds = (time.perf_counter() - start) / args.repeat
+        print(f"{name:>8}: {1e6 * seconds:.1f}us per call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Knights benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser(
+        "sat", help="SAT entailment against enumerating models"
+    )
+    command.add_argument("--sizes", type=int, nargs="+",
+                         default=[3, 6, 8, 50, 100, 250],
+                         help="characters per puzzle "
+                              "(default: 3 6 8 50 100 250)")
+    command.add_argument("--enumeration-max", type=int, default=16,
+                         help="most symbols to enumerate models of "
+                              "(default: 16)")
+    command.add_argument("--seed", type=int, default=0)
+    command = commands.add_parser(
+        "truthtable", help="truth-table kernels against enumerating models"
+    )
+    command.add_argument("--sizes", type=int, nargs="+",
+                         default=[3, 5, 7, 8, 10, 12],
+                         help="characters per puzzle "
+                              "(default: 3 5 7 8 10 12)")
+    command.add_argument("--enumeration-max", type=int, default=16,
+                         help="most symbols to enumerate models of "
+                              "(default: 16)")
+    command.add_argument("--seed", type=int, default=0)
+    command = commands.add_parser(
+        "interning", help="memory and hashing of a large knowledge base"
+    )
+    command.add_argument("--characters", type=int, default=1000,
+                         help="characters in each puzzle (default: 1000)")
+    command.add_argument("--puzzles", type=int, default=20,
+                         help="puzzles over the same characters "
+                              "(default: 20)")
+    command.add_argument("--repeat", type=int, default=20,
+                         help="calls timed per operation (default: 20)")
+    args = parser.parse_args()
+
+    if args.command == "sat":
+        bench_sat(args)
+    elif args.command == "truthtable":
+        bench_truthtable(args)
+    elif args.command == "interning":
+        bench_interning(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,64 @@
-import itertools
+import weakref
+
+import sat
 
 
 class Sentence():
+    """
+    Sentences are immutable and hash-consed: building a sentence that is
+    structurally identical to one that already exists returns that same
+    object, so equal sentences are identical, and their hash, symbols
+    and formula are computed at most once. The one exception is And,
+    which can grow like a knowledge base until it becomes part of
+    another sentence.
+    """
+
+    __slots__ = ("hash", "symbol_set", "formula_string", "__weakref__")
+
+    # Attributes holding the operands of each class of sentence
+    fields = ()
+
+    # Every live sentence, by class and operands
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, operands, *values):
+        """
+        Returns the sentence of class `cls` with `operands`, creating it
+        with `values` as its `fields` if it does not exist yet.
+        """
+        key = (cls,) + operands
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            setattr = object.__setattr__
+            setattr(sentence, "hash", hash(key))
+            setattr(sentence, "symbol_set", None)
+            setattr(sentence, "formula_string", None)
+            for name, value in zip(cls.fields, values):
+                setattr(sentence, name, value)
+            Sentence.interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self.hash
+
+    def __reduce__(self):
+        return (type(self), tuple(self.operands()))
+
+    def operands(self):
+        """Returns the arguments the sentence was built from."""
+        return tuple(getattr(self, name) for name in self.fields)
+
+    def shared(self):
+        """Returns the shared, immutable sentence equal to this one."""
+        return self
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -9,11 +66,24 @@ class Sentence():
 
     def formula(self):
         """Returns string formula representing logical sentence."""
+        if self.formula_string is None:
+            object.__setattr__(self, "formula_string", self.build_formula())
+        return self.formula_string
+
+    def build_formula(self):
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.frozen_symbols())
+
+    def frozen_symbols(self):
+        """Returns the symbols in the logical sentence as a frozenset."""
+        if self.symbol_set is None:
+            object.__setattr__(self, "symbol_set", frozenset().union(
+                *[operand.frozen_symbols() for operand in self.operands()]
+            ))
+        return self.symbol_set
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +113,14 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+    fields = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        symbol = cls.intern((name,), name)
+        if symbol.symbol_set is None:
+            object.__setattr__(symbol, "symbol_set", frozenset([name]))
+        return symbol
 
     def __repr__(self):
         return self.name
@@ -65,20 +134,15 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
-
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
+    fields = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        operand = operand.shared()
+        return cls.intern((operand,), operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +150,53 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
+    def build_formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    """
+    A conjunction. And(...) returns a new conjunction that `add` can
+    extend, as a knowledge base is built up. `shared()`, which is called
+    on it when it becomes part of another sentence, returns an interned
+    copy with its conjuncts in a tuple, and that copy is what the other
+    sentence holds; it cannot grow, and `add` on it raises TypeError.
+    So `add` after nesting still extends the And that was built, but
+    does not change what the enclosing sentence sees. An And that is
+    not shared does not cache its symbols and formula, and is equal to
+    any conjunction of the same conjuncts.
+    """
+    __slots__ = ("conjuncts",)
+    fields = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        conjunction = object.__new__(cls)
+        setattr = object.__setattr__
+        setattr(conjunction, "hash", None)
+        setattr(conjunction, "symbol_set", None)
+        setattr(conjunction, "formula_string", None)
+        setattr(conjunction, "conjuncts",
+                [conjunct.shared() for conjunct in conjuncts])
+        return conjunction
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        if self is other:
+            return True
+        if type(other) is not And:
+            return NotImplemented
+        return tuple(self.conjuncts) == tuple(other.conjuncts)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self.hash is None:
+            return hash((And,) + tuple(self.conjuncts))
+        return self.hash
+
+    def __reduce__(self):
+        if self.hash is None:
+            return (And, tuple(self.conjuncts))
+        return (And.intern, (self.conjuncts, self.conjuncts))
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -113,68 +204,81 @@ class And(Sentence):
         )
         return f"And({conjunctions})"
 
+    def operands(self):
+        return self.conjuncts
+
+    def shared(self):
+        if self.hash is not None:
+            return self
+        conjuncts = tuple(self.conjuncts)
+        return And.intern(conjuncts, conjuncts)
+
     def add(self, conjunct):
+        if self.hash is not None:
+            raise TypeError("this conjunction is part of other sentences "
+                            "and cannot change")
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        self.conjuncts.append(conjunct.shared())
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
     def formula(self):
+        if self.hash is None:
+            return self.build_formula()
+        return Sentence.formula(self)
+
+    def build_formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def frozen_symbols(self):
+        if self.hash is None:
+            return frozenset().union(*[conjunct.frozen_symbols()
+                                       for conjunct in self.conjuncts])
+        return Sentence.frozen_symbols(self)
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+    fields = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        disjuncts = tuple(disjunct.shared() for disjunct in disjuncts)
+        return cls.intern(disjuncts, disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
+    def operands(self):
+        return self.disjuncts
+
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def build_formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+    fields = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        antecedent = antecedent.shared()
+        consequent = consequent.shared()
+        return cls.intern((antecedent, consequent),
+                          antecedent, consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +287,22 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
+    def build_formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+    fields = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        left = left.shared()
+        right = right.shared()
+        return cls.intern((left, right), left, right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,18 +313,127 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
-    def formula(self):
+    def build_formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+
+class CNF():
+    """
+    A conjunction of clauses over integer variables, built from sentences
+    by the Tseitin encoding: every compound subsentence gets a variable
+    of its own, defined by a few clauses to be equivalent to the
+    subsentence, so the clauses grow linearly with the sentences.
+    Symbols are numbered in `variables` by name.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.clauses = []
+        self.n_variables = 0
+        # Literals of the sentences encoded so far, by id, with the
+        # sentence itself so that its id is not reused
+        self.literals = {}
+
+    def variable(self):
+        self.n_variables += 1
+        return self.n_variables
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses
+        that define it.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if id(sentence) in self.literals:
+            return self.literals[id(sentence)][1]
+
+        if isinstance(sentence, (And, Or)):
+            sign = 1 if isinstance(sentence, And) else -1
+            operands = [sign * self.literal(operand) for operand in (
+                sentence.conjuncts if sign == 1 else sentence.disjuncts
+            )]
+            # x <=> (a ∧ b ...), or with every literal negated,
+            # ¬x <=> (¬a ∧ ¬b ...) for x <=> (a ∨ b ...)
+            x = sign * self.variable()
+            for a in operands:
+                self.clauses.append([-x, a])
+            self.clauses.append([x] + [-a for a in operands])
+            x *= sign
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            x = self.variable()
+            self.clauses += [[-x, -a, b], [x, a], [x, -b]]
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.variable()
+            self.clauses += [[-x, -a, b], [-x, a, -b],
+                             [x, a, b], [x, -a, -b]]
+        else:
+            raise TypeError(f"cannot encode {type(sentence).__name__}")
+        self.literals[id(sentence)] = (sentence, x)
+        return x
+
+    def add(self, sentence):
+        """
+        Adds clauses that hold exactly when `sentence` does. Connectives
+        at the top are added as clauses directly rather than through
+        variables of their own.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct)
+                                 for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.add(Or(Not(sentence.antecedent), sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            self.clauses += [[-a, b], [a, -b]]
+        elif isinstance(sentence, Not):
+            operand = sentence.operand
+            if isinstance(operand, Not):
+                self.add(operand.operand)
+            elif isinstance(operand, And):
+                self.add(Or(*[Not(conjunct)
+                              for conjunct in operand.conjuncts]))
+            elif isinstance(operand, Or):
+                for disjunct in operand.disjuncts:
+                    self.add(Not(disjunct))
+            elif isinstance(operand, Implication):
+                self.add(operand.antecedent)
+                self.add(Not(operand.consequent))
+            else:
+                self.clauses.append([self.literal(sentence)])
+        else:
+            self.clauses.append([self.literal(sentence)])
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
+    # Knowledge entails query when knowledge and not query is unsatisfiable
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not sat.Solver(cnf.n_variables, cnf.clauses).solve()
+
+
+def model_check_enumeration(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating every model.
+    """
+
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
@@ -0,0 +1,302 @@
+"""
+A CDCL SAT solver over clauses in CNF.
+
+Variables are the integers 1 to n and a literal is v or -v, as in the
+DIMACS format; a clause is a list of literals. The solver is the usual
+conflict-driven clause learning loop:
+
+- Unit propagation with two watched literals per clause, so a clause is
+  only looked at when one of its two watched literals becomes false.
+- On a conflict, a clause is learned at the first unique implication
+  point and the solver backjumps to the second highest level in it.
+- Decisions take the unassigned variable with the highest activity,
+  bumped for the variables in each conflict and decayed over time, with
+  the value it last had.
+- Restarts follow the Luby sequence; learned clauses are kept.
+
+Assumptions are literals that hold for one call to `solve`, so the same
+clauses can be queried repeatedly, keeping what was learned.
+"""
+import heapq
+
+# Conflicts per unit of the Luby restart sequence
+RESTART_BASE = 100
+
+# Factor by which variable activities decay after every conflict
+DECAY = 0.95
+
+# Activity beyond which all activities are scaled down
+RESCALE = 1e100
+
+
+def luby(i):
+    """
+    Returns the i-th term of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...,
+    counting from 0.
+    """
+    size = 1
+    power = 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i %= size
+    return 2 ** power
+
+
+class Solver():
+    """
+    A CDCL solver for a fixed number of variables. Lists indexed by
+    literal have 2n + 1 entries, so that literal -v lands at index
+    2n + 1 - v, past every positive literal.
+    """
+
+    def __init__(self, n_variables, clauses=()):
+        n = n_variables
+        self.n_variables = n
+        # 1 if a literal is true, -1 if false, 0 if unassigned
+        self.values = [0] * (2 * n + 1)
+        self.levels = [0] * (n + 1)
+        self.reasons = [None] * (n + 1)
+        self.phases = [False] * (n + 1)
+        self.activity = [0.0] * (n + 1)
+        self.increment = 1.0
+        self.order = [(0.0, v) for v in range(1, n + 1)]
+        # Clauses watching each literal, to be visited when it is false
+        self.watches = [[] for _ in range(2 * n + 1)]
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.ok = True
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def add_clause(self, clause):
+        """
+        Adds a clause at level 0. Returns False if the clauses are now
+        known to be unsatisfiable. Unit clauses are assigned at once and
+        propagated by the next call to `solve`.
+        """
+        if self.trail_limits:
+            self.backtrack(0)
+        if not self.ok:
+            return False
+        values = self.values
+        literals = []
+        for literal in clause:
+            value = values[literal]
+            if value == 1:
+                return True
+            if value == 0 and literal not in literals:
+                if -literal in literals:
+                    return True
+                literals.append(literal)
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+        else:
+            self.watches[literals[0]].append(literals)
+            self.watches[literals[1]].append(literals)
+        return self.ok
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.values[literal] = 1
+        self.values[-literal] = -1
+        self.levels[v] = len(self.trail_limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns the literals implied by unit clauses. Returns a clause
+        with every literal false, or None.
+        """
+        values = self.values
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watching = watches[false]
+            kept = []
+            for k, clause in enumerate(watching):
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if values[first] == 1:
+                    kept.append(clause)
+                    continue
+                for m in range(2, len(clause)):
+                    if values[clause[m]] != -1:
+                        clause[1], clause[m] = clause[m], false
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[first] == -1:
+                        kept += watching[k + 1:]
+                        watches[false] = kept
+                        return clause
+                    self.assign(first, clause)
+            watches[false] = kept
+        return None
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > RESCALE:
+            self.activity = [a / RESCALE for a in self.activity]
+            self.increment /= RESCALE
+            self.rebuild_order()
+
+    def rebuild_order(self):
+        """
+        Rebuilds the heap of unassigned variables by activity, dropping
+        the stale entries left by bumps and backtracking.
+        """
+        self.order = [(-self.activity[v], v)
+                      for v in range(1, self.n_variables + 1)
+                      if self.values[v] == 0]
+        heapq.heapify(self.order)
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, with the literal to
+        assert first and a literal of the level to backjump to second,
+        and that level.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            # A reason clause has the literal it implied first
+            for q in clause if literal is None else clause[1:]:
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learned.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        second = max(range(1, len(learned)),
+                     key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[second] = learned[second], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment above `level`.
+        """
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            v = abs(literal)
+            self.values[literal] = 0
+            self.values[-literal] = 0
+            self.reasons[v] = None
+            self.phases[v] = literal > 0
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = start
+        if len(self.order) > 4 * self.n_variables:
+            self.rebuild_order()
+
+    def decide(self):
+        """
+        Returns the literal of the most active unassigned variable, or
+        None if every variable is assigned.
+        """
+        while self.order:
+            activity, v = heapq.heappop(self.order)
+            if self.values[v] == 0 and -activity == self.activity[v]:
+                return v if self.phases[v] else -v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses and `assumptions` are satisfiable,
+        leaving the assignment found for `model`, or False.
+        """
+        self.backtrack(0)
+        if not self.ok or self.propagate() is not None:
+            self.ok = False
+            return False
+        restarts = 0
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watches[learned[0]].append(learned)
+                    self.watches[learned[1]].append(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= DECAY
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are the first decisions
+            literal = None
+            while len(self.trail_limits) < len(assumptions):
+                assumption = assumptions[len(self.trail_limits)]
+                value = self.values[assumption]
+                if value == -1:
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value == 0:
+                    literal = assumption
+                    break
+            if literal is None:
+                literal = self.decide()
+                if literal is None:
+                    return True
+                self.decisions += 1
+                self.trail_limits.append(len(self.trail))
+            self.assign(literal, None)
+
+    def model(self):
+        """
+        Returns the value of every variable, indexed from 1, after
+        `solve` returned True.
+        """
+        return [None] + [self.values[v] == 1
+                         for v in range(1, self.n_variables + 1)]
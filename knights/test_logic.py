@@ -0,0 +1,41 @@
+"""
+Tests for the hash-consed sentences of logic.py.
+
+Usage: python -m unittest test_logic
+"""
+import unittest
+
+from logic import And, Implication, Not, Or, Symbol, model_check
+
+
+class TestAnd(unittest.TestCase):
+
+    def setUp(self):
+        self.a = Symbol("A")
+        self.b = Symbol("B")
+        self.c = Symbol("C")
+
+    def test_add_after_nesting(self):
+        knowledge = And(self.a)
+        sentence = Or(knowledge, self.b)
+        knowledge.add(self.c)
+        self.assertEqual(knowledge, And(self.a, self.c))
+        self.assertEqual(sentence, Or(And(self.a), self.b))
+        self.assertEqual(sentence.formula(), Or(And(self.a),
+                                                self.b).formula())
+        self.assertTrue(model_check(knowledge, self.c))
+        self.assertFalse(model_check(sentence, self.c))
+
+    def test_nested_copy_cannot_grow(self):
+        knowledge = And(self.a, self.b)
+        sentence = Implication(knowledge, Not(self.c))
+        nested = sentence.antecedent
+        self.assertIsNot(nested, knowledge)
+        self.assertEqual(nested, knowledge)
+        with self.assertRaises(TypeError):
+            nested.add(self.c)
+        self.assertIs(nested, And(self.a, self.b).shared())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Exhaustive model checking by compiling sentences into bitwise kernels.
+
+With n symbols there are 2^n models, and model m sets symbol i true
+when bit i of m is set. A sentence is then a 2^n-bit integer whose bit
+m is its truth value in model m: each symbol is a fixed pattern of bits,
+and ¬, ∧, ∨, => and <=> are bitwise operations on whole integers, which
+Python runs as tight loops over machine words.
+
+A list of sentences is compiled once into the source of a Python
+function with one line per distinct subsentence, so evaluating every
+sentence in every model is a single call with no recursion and no
+model dicts. Knowledge entails a query when no model has the knowledge
+true and the query false.
+
+Beyond CHUNK_SYMBOLS symbols, the models are checked in chunks of
+2^CHUNK_SYMBOLS, with the remaining symbols fixed for each chunk, so
+memory stays bounded.
+"""
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Symbols varying within one chunk of models
+CHUNK_SYMBOLS = 20
+
+
+def symbol_masks(n):
+    """
+    Returns the truth values of `n` symbols in every one of the 2^n
+    models, each as an integer with one bit per model.
+    """
+    size = 2 ** n
+    masks = []
+    for i in range(n):
+        # Blocks of 2^i false models then 2^i true ones, doubled until
+        # they cover every model
+        block = 2 ** i
+        mask = ((1 << block) - 1) << block
+        width = 2 * block
+        while width < size:
+            mask |= mask << width
+            width *= 2
+        masks.append(mask)
+    return masks
+
+
+def compile_kernel(sentences, symbols):
+    """
+    Returns a function of the masks of `symbols`, in order, and the mask
+    of all models that returns the masks of `sentences`, and its source.
+    """
+    position = {name: i for i, name in enumerate(symbols)}
+    lines = []
+    registers = {}
+
+    def register(sentence):
+        if isinstance(sentence, Symbol):
+            return f"s[{position[sentence.name]}]"
+        if id(sentence) in registers:
+            return registers[id(sentence)][1]
+        if isinstance(sentence, Not):
+            expression = f"full ^ {register(sentence.operand)}"
+        elif isinstance(sentence, And):
+            expression = " & ".join(
+                [register(conjunct) for conjunct in sentence.conjuncts]
+            ) or "full"
+        elif isinstance(sentence, Or):
+            expression = " | ".join(
+                [register(disjunct) for disjunct in sentence.disjuncts]
+            ) or "0"
+        elif isinstance(sentence, Implication):
+            expression = (f"(full ^ {register(sentence.antecedent)}) | "
+                          f"{register(sentence.consequent)}")
+        elif isinstance(sentence, Biconditional):
+            expression = (f"full ^ {register(sentence.left)} ^ "
+                          f"{register(sentence.right)}")
+        else:
+            raise TypeError(f"cannot compile {type(sentence).__name__}")
+        name = f"t{len(lines)}"
+        lines.append(f"    {name} = {expression}")
+        # Keep the sentence so that its id is not reused
+        registers[id(sentence)] = (sentence, name)
+        return name
+
+    results = [register(sentence) for sentence in sentences]
+    source = "\n".join(["def kernel(s, full):"] + lines
+                       + [f"    return [{', '.join(results)}]"])
+    namespace = {}
+    exec(compile(source, "<kernel>", "exec"), namespace)
+    return namespace["kernel"], source
+
+
+def entailed(knowledge, queries):
+    """
+    Returns whether knowledge base entails each of `queries`, evaluating
+    the knowledge and every query together in each chunk of models.
+    """
+    queries = list(queries)
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    kernel, _ = compile_kernel([knowledge] + queries, symbols)
+    low = min(len(symbols), CHUNK_SYMBOLS)
+    full = (1 << 2 ** low) - 1
+    masks = symbol_masks(low)
+    holds = [True] * len(queries)
+    for chunk in range(2 ** (len(symbols) - low)):
+        fixed = [full if chunk >> j & 1 else 0
+                 for j in range(len(symbols) - low)]
+        knowledge_mask, *query_masks = kernel(masks + fixed, full)
+        for i, query_mask in enumerate(query_masks):
+            # A model of the knowledge where the query is false
+            if knowledge_mask & ~query_mask:
+                holds[i] = False
+        if not any(holds):
+            break
+    return holds
+
+
+def model_check_truthtable(knowledge, query):
+    """Checks if knowledge base entails query."""
+    return entailed(knowledge, [query])[0]
@@ -0,0 +1,596 @@
+"""
+Benchmarks for the pagerank project.
+
+Usage: python benchmark.py sample [--pages N] [--samples N] [--workers N]
+       python benchmark.py crawl [--pages N] [--workers N]
+       python benchmark.py incremental [--pages N] [--edits FRACTION]
+       python benchmark.py personalized [--pages N] [--queries N]
+       python benchmark.py suite [--pages N] [--shapes SHAPE ...]
+                                 [--output FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+import crawler
+import edgelist
+import incremental
+import parallel
+import personalized
+from linkgraph import LinkGraph, power_iterate, warm_start
+from pagerank import DAMPING, MAX_ITERATIONS, transition_model
+from processes import peak_memory
+from sampler import parallel_counts
+
+SHAPES = ("uniform", "power-law", "dangling", "disconnected")
+ENGINES = ("legacy-iterate", "iterate", "sample", "edges", "parallel",
+           "gauss-seidel")
+RESULTS_VERSION = 1
+
+
+def random_corpus(n_pages, max_links, seed):
+    """
+    Returns a corpus of `n_pages` pages, each linking to up to
+    `max_links` random other pages.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(n_pages)]
+    return {
+        page: {pages[rng.randrange(n_pages)]
+               for _ in range(rng.randint(0, max_links))} - {page}
+        for page in pages
+    }
+
+
+def clustered_corpus(n_pages, max_links, cluster_size, cross, seed):
+    """
+    Returns a corpus of `n_pages` pages in clusters of `cluster_size`
+    consecutive pages, like the sites of a web crawl: each page links
+    to up to `max_links` pages, each of them in its own cluster except
+    with probability `cross`.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(n_pages)]
+    corpus = {}
+    for i, page in enumerate(pages):
+        first = i - i % cluster_size
+        size = min(cluster_size, n_pages - first)
+        corpus[page] = {
+            pages[rng.randrange(n_pages) if rng.random() < cross
+                  else first + rng.randrange(size)]
+            for _ in range(rng.randint(1, max_links))
+        } - {page}
+    return corpus
+
+
+def shaped_corpus(shape, n_pages, links, seed):
+    """
+    Returns a random corpus of `n_pages` pages of a given shape:
+
+    uniform        up to 2 * `links` links per page, to uniform targets
+    power-law      Zipf-distributed link counts, to targets drawn with
+                   Zipf-like popularity, so a few pages are hubs
+    dangling       like uniform, but most pages have no links
+    disconnected   like uniform, within four separate components
+    """
+    rng = np.random.default_rng(seed)
+    if shape == "power-law":
+        out_degree = np.minimum(rng.zipf(2.2, n_pages), n_pages - 1)
+    else:
+        out_degree = rng.integers(0, 2 * links + 1, n_pages)
+    if shape == "dangling":
+        out_degree[rng.random(n_pages) < 0.7] = 0
+    sources = np.repeat(np.arange(n_pages), out_degree)
+
+    if shape == "power-law":
+        popularity = 1 / np.arange(1, n_pages + 1) ** 0.9
+        targets = rng.choice(rng.permutation(n_pages), len(sources),
+                             p=popularity / popularity.sum())
+    elif shape == "disconnected":
+        # Pages i with equal i % 4 form one component
+        targets = (rng.integers(0, n_pages // 4, len(sources)) * 4
+                   + sources % 4)
+        targets[targets >= n_pages] = sources[targets >= n_pages]
+    else:
+        targets = rng.integers(0, n_pages, len(sources))
+
+    pages = [f"{i}.html" for i in range(n_pages)]
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        if source != target:
+            corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def write_corpus(corpus, directory, padding=0):
+    """
+    Writes a corpus as HTML pages, each with `padding` bytes of filler
+    text, into `directory`.
+    """
+    filler = "<p>" + "lorem ipsum " * (padding // 12) + "</p>\n"
+    for page, links in corpus.items():
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head>\n"
+                    f"<title>{page}</title>\n</head>\n<body>\n")
+            f.write(filler)
+            for link in links:
+                f.write(f'<a href="{link}">{link}</a>\n')
+            f.write("</body>\n</html>\n")
+
+
+def legacy_crawl(directory):
+    """
+    The original crawl: each page is read whole and searched with a
+    regular expression, one after another.
+    """
+    pages = dict()
+    for filename in os.listdir(directory):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            contents = f.read()
+            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+            pages[filename] = set(links) - {filename}
+    for filename in pages:
+        pages[filename] = set(
+            link for link in pages[filename]
+            if link in pages
+        )
+    return pages
+
+
+def legacy_iterate(corpus, damping_factor):
+    """
+    The original iterate_pagerank: dangling pages are given incoming
+    links from every page, and ranks are updated page by page.
+    """
+    pages = list(corpus.keys())
+    n_pages = len(pages)
+    ranks = {p: 1 / n_pages for p in pages}
+    incoming = {p: set() for p in pages}
+    for p in pages:
+        if corpus[p]:
+            for q in corpus[p]:
+                incoming[q].add(p)
+        else:
+            for q in pages:
+                incoming[q].add(p)
+    while True:
+        new_ranks = {}
+        for p in pages:
+            rank = (1 - damping_factor) / n_pages
+            summation = 0
+            for q in incoming[p]:
+                links_q = corpus[q] if corpus[q] else set(pages)
+                summation += ranks[q] / len(links_q)
+            rank += damping_factor * summation
+            new_ranks[p] = rank
+        if all(abs(new_ranks[p] - ranks[p]) < 0.001 for p in pages):
+            break
+        ranks = new_ranks
+    return ranks
+
+
+def legacy_sample(corpus, damping_factor, n):
+    """
+    The original sample_pagerank: a full transition distribution is
+    built and sampled from at every step.
+    """
+    pages = list(corpus.keys())
+    counts = {p: 0 for p in pages}
+    current = random.choice(pages)
+    counts[current] += 1
+    for _ in range(1, n):
+        distribution = transition_model(corpus, current, damping_factor)
+        current = random.choices(
+            population=list(distribution.keys()),
+            weights=list(distribution.values()),
+            k=1
+        )[0]
+        counts[current] += 1
+    return {p: counts[p] / n for p in pages}
+
+
+def bench_sample(args):
+    corpus = random_corpus(args.pages, args.links, args.seed)
+    graph = LinkGraph.from_corpus(corpus)
+    print(f"{'sampler':<24}{'samples':>12}{'samples/s':>14}")
+
+    start = time.perf_counter()
+    legacy_sample(corpus, DAMPING, args.legacy_samples)
+    elapsed = time.perf_counter() - start
+    print(f"{'transition_model':<24}{args.legacy_samples:>12}"
+          f"{args.legacy_samples / elapsed:>14.0f}")
+
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        parallel_counts(graph, DAMPING, args.samples, workers, args.seed)
+        elapsed = time.perf_counter() - start
+        label = f"vectorized ({workers} proc)"
+        print(f"{label:<24}{args.samples:>12}{args.samples / elapsed:>14.0f}")
+
+
+def bench_crawl(args):
+    corpus = random_corpus(args.pages, args.links, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(corpus, directory, args.padding)
+        print(f"{'crawler':<24}{'parsed':>10}{'seconds':>10}{'pages/s':>12}")
+
+        def report(label, parsed, elapsed):
+            print(f"{label:<24}{parsed:>10}{elapsed:>10.3f}"
+                  f"{args.pages / elapsed:>12.0f}")
+
+        start = time.perf_counter()
+        legacy = legacy_crawl(directory)
+        report("regex (legacy)", args.pages, time.perf_counter() - start)
+
+        stats = {}
+        for label, cache in [("chunked, no cache", False),
+                             ("chunked, cold", True),
+                             ("chunked, warm", True)]:
+            result = crawler.crawl(directory, args.workers, cache, stats)
+            if result != legacy:
+                raise RuntimeError(f"{label} crawl disagrees with legacy")
+            report(label, stats["parsed"], stats["seconds"])
+
+        # Touch 1% of the pages so only they are parsed again
+        rng = random.Random(args.seed)
+        for page in rng.sample(list(corpus), max(args.pages // 100, 1)):
+            os.utime(os.path.join(directory, page),
+                     ns=(time.time_ns(), time.time_ns()))
+        crawler.crawl(directory, args.workers, True, stats)
+        report("chunked, 1% changed", stats["parsed"], stats["seconds"])
+
+
+def bench_incremental(args):
+    """
+    Ranks a random corpus and a clustered one, edits a few consecutive
+    pages of each, and ranks the edited corpus from scratch, from a
+    warm start and by residual push from the earlier ranks.
+    """
+    print(f"{'corpus':<11}{'start':<7}{'iterations':>12}{'link sweeps':>13}"
+          f"{'seconds':>9}{'L1 vs cold':>12}")
+    for label, corpus in (
+        ("random", random_corpus(args.pages, args.links, args.seed)),
+        ("clustered", clustered_corpus(args.pages, args.links,
+                                       args.cluster_size, args.cross,
+                                       args.seed))
+    ):
+        previous = LinkGraph.from_corpus(corpus)
+        previous_ranks = power_iterate(previous, DAMPING, args.tolerance,
+                                       MAX_ITERATIONS)
+
+        # Give consecutive pages, so pages of the same clusters, new
+        # links to pages of their cluster, or anywhere in the random
+        # corpus, and replace a tenth as many of them by new pages
+        rng = random.Random(args.seed + 1)
+        pages = list(corpus)
+        size = len(pages) if label == "random" else args.cluster_size
+        count = max(int(len(pages) * args.edits), 1)
+        first = rng.randrange(len(pages) - count + 1)
+
+        def new_links(i):
+            cluster = pages[i - i % size:i - i % size + size]
+            return {rng.choice(cluster)
+                    for _ in range(rng.randint(1, args.links))}
+
+        for i in range(first, first + count):
+            corpus[pages[i]] = new_links(i) - {pages[i]}
+        replaced = set(pages[first:first + count // 10])
+        for i, page in enumerate(replaced):
+            del corpus[page]
+            corpus[f"new{i}.html"] = new_links(first + i) - replaced
+        for page, links in corpus.items():
+            if links & replaced:
+                corpus[page] = links - replaced
+        graph = LinkGraph.from_corpus(corpus)
+
+        cold = None
+        for start in ("cold", "warm", "push"):
+            stats = {}
+            begin = time.perf_counter()
+            if start == "push":
+                ranks = incremental.push_update(
+                    graph, previous, previous_ranks, DAMPING,
+                    args.tolerance, MAX_ITERATIONS, stats
+                )
+                # Two sweeps find the residual, over the old and new links
+                sweeps = (2 + stats["pushed_links"] / len(graph.targets)
+                          + stats["iterations"] - stats["rounds"])
+            else:
+                ranks = power_iterate(
+                    graph, DAMPING, args.tolerance, MAX_ITERATIONS,
+                    None if start == "cold" else warm_start(
+                        graph, previous.to_dict(previous_ranks)
+                    ), stats
+                )
+                sweeps = stats["iterations"]
+            elapsed = time.perf_counter() - begin
+            if cold is None:
+                cold = ranks
+            print(f"{label:<11}{start:<7}{stats['iterations']:>12}"
+                  f"{sweeps:>13.1f}{elapsed:>9.3f}"
+                  f"{np.abs(ranks - cold).sum():>12.1e}")
+
+
+def bench_personalized(args):
+    corpus = random_corpus(args.pages, args.links, args.seed)
+    graph = LinkGraph.from_corpus(corpus)
+    rng = random.Random(args.seed)
+    queries = rng.sample(graph.pages, args.queries)
+
+    # Exact personalized ranks by power iteration, jumping to the seed
+    elapsed = 0
+    exact = []
+    for seed in queries:
+        jump = np.zeros(len(graph))
+        jump[graph.index[seed]] = 1
+        start = time.perf_counter()
+        ranks = power_iterate(graph, DAMPING, 1e-10, MAX_ITERATIONS,
+                              jump=jump)
+        elapsed += time.perf_counter() - start
+        exact.append(graph.to_dict(ranks))
+    print(f"{'method':<24}{'ms/query':>10}{'pushes':>10}"
+          f"{'L1 error':>10}{'top-10':>8}")
+    print(f"{'power iteration':<24}{elapsed / len(queries) * 1000:>10.2f}"
+          f"{'':>10}{'':>10}{'':>8}")
+
+    for epsilon in args.epsilons:
+        elapsed = 0
+        pushes = 0
+        error = 0
+        overlap = 0
+        stats = {}
+        for seed, ranks in zip(queries, exact):
+            start = time.perf_counter()
+            estimates = personalized.forward_push(corpus, [seed],
+                                                  epsilon=epsilon,
+                                                  stats=stats)
+            elapsed += time.perf_counter() - start
+            pushes += stats["pushes"]
+            error += sum(abs(rank - estimates.get(page, 0))
+                         for page, rank in ranks.items())
+            best = set(sorted(ranks, key=ranks.get, reverse=True)[:10])
+            found = sorted(estimates, key=estimates.get, reverse=True)[:10]
+            overlap += len(best.intersection(found)) / 10
+        label = f"forward push {epsilon:g}"
+        print(f"{label:<24}{elapsed / len(queries) * 1000:>10.2f}"
+              f"{pushes / len(queries):>10.0f}{error / len(queries):>10.4f}"
+              f"{overlap / len(queries):>8.0%}")
+
+
+def run_engine(engine, directory, options):
+    """
+    Runs one engine on the graph saved in `directory` and returns its
+    measurements; called in a fresh process so peak memory is its own.
+    Only engines that take a corpus dictionary load it.
+    """
+    reference = np.load(os.path.join(directory, "reference.npy"))
+    if engine in ("legacy-iterate", "iterate", "sample"):
+        with open(os.path.join(directory, "corpus.pickle"), "rb") as f:
+            corpus = pickle.load(f)
+    path = os.path.join(directory, "graph.edges")
+    tolerance = options["tolerance"]
+    stats = {}
+    before = peak_memory()
+
+    start = time.perf_counter()
+    if engine == "legacy-iterate":
+        graph = LinkGraph.from_corpus(corpus)
+        ranks = graph.to_vector(legacy_iterate(corpus, DAMPING))
+    elif engine == "iterate":
+        graph = LinkGraph.from_corpus(corpus)
+        ranks = power_iterate(graph, DAMPING, tolerance, MAX_ITERATIONS,
+                              stats=stats)
+    elif engine == "sample":
+        graph = LinkGraph.from_corpus(corpus)
+        ranks = parallel_counts(graph, DAMPING, options["samples"], 1,
+                                options["seed"]) / options["samples"]
+    elif engine == "edges":
+        ranks = edgelist.iterate_edges(edgelist.EdgeList(path), DAMPING,
+                                       tolerance, stats=stats)
+    elif engine == "parallel":
+        ranks = parallel.iterate_parallel(path, DAMPING, tolerance,
+                                          workers=options["workers"],
+                                          stats=stats)
+    else:
+        # Gauss-Seidel runs in one process
+        ranks = parallel.iterate_parallel(path, DAMPING, tolerance,
+                                          gauss_seidel=True, stats=stats)
+    elapsed = time.perf_counter() - start
+
+    after = peak_memory()
+    return {
+        "engine": engine,
+        "seconds": elapsed,
+        "peak_mib": None if after is None else after / 2 ** 20,
+        "input_mib": None if before is None else before / 2 ** 20,
+        "iterations": stats.get("iterations"),
+        "residuals": stats.get("residuals", []),
+        "l1_error": float(np.abs(ranks - reference).sum()),
+    }
+
+
+def revision():
+    """
+    Returns the git commit of the benchmarked code, if there is one.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def bench_suite(args):
+    options = {"tolerance": args.tolerance, "samples": args.samples,
+               "workers": args.workers, "seed": args.seed}
+    report = {
+        "version": RESULTS_VERSION,
+        "revision": revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+        "options": dict(options, pages=args.pages, links=args.links),
+        "results": [],
+    }
+    # Each engine runs in a fresh process forked from a server started
+    # before any graph is built, as a child's peak memory counts its
+    # parent's
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    pool = context.Pool(1, maxtasksperchild=1)
+    print(f"{'shape':<14}{'engine':<16}{'seconds':>9}{'peak MiB':>10}"
+          f"{'iters':>7}{'L1 error':>11}")
+    for shape in args.shapes:
+        corpus = shaped_corpus(shape, args.pages, args.links, args.seed)
+        graph = LinkGraph.from_corpus(corpus)
+        reference = power_iterate(graph, DAMPING, 1e-14, 10 * MAX_ITERATIONS)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "corpus.pickle"), "wb") as f:
+                pickle.dump(corpus, f)
+            np.save(os.path.join(directory, "reference.npy"), reference)
+            edgelist.export_corpus(corpus, os.path.join(directory,
+                                                        "graph.edges"))
+            for engine in args.engines:
+                if engine == "legacy-iterate" and args.pages > args.legacy_max:
+                    continue
+                result = pool.apply(run_engine, (engine, directory, options))
+                result = dict(shape=shape, pages=len(graph),
+                              links=len(graph.targets), **result)
+                report["results"].append(result)
+                peak = result["peak_mib"]
+                print(f"{shape:<14}{engine:<16}{result['seconds']:>9.3f}"
+                      f"{'n/a' if peak is None else f'{peak:.1f}':>10}"
+                      f"{result['iterations'] or '':>7}"
+                      f"{result['l1_error']:>11.2e}")
+    pool.close()
+    pool.join()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline is not None:
+        compare(args.baseline, report)
+
+
+def compare(path, report):
+    """
+    Prints how the time and error of each (shape, engine) changed since
+    the results saved at `path`.
+    """
+    with open(path) as f:
+        baseline = json.load(f)
+    before = {(result["shape"], result["engine"]): result
+              for result in baseline["results"]}
+    print(f"Compared with {path} ({baseline.get('revision') or 'unknown'})")
+    print(f"{'shape':<14}{'engine':<16}{'time':>9}{'L1 error':>11}")
+    for result in report["results"]:
+        old = before.get((result["shape"], result["engine"]))
+        if old is None:
+            continue
+        ratio = result["seconds"] / max(old["seconds"], 1e-9)
+        print(f"{result['shape']:<14}{result['engine']:<16}{ratio:>8.2f}x"
+              f"{old['l1_error']:>11.2e} -> {result['l1_error']:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "sample", help="compare Monte Carlo sampler throughput"
+    )
+    command.add_argument("--pages", type=int, default=10000)
+    command.add_argument("--links", type=int, default=10,
+                         help="most links per page")
+    command.add_argument("--samples", type=int, default=10 ** 7)
+    command.add_argument("--legacy-samples", type=int, default=1000,
+                         help="samples to time the original sampler on")
+    command.add_argument("--workers", type=int, default=1)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_sample)
+
+    command = commands.add_parser(
+        "crawl", help="compare crawler throughput, with and without cache"
+    )
+    command.add_argument("--pages", type=int, default=20000)
+    command.add_argument("--links", type=int, default=10,
+                         help="most links per page")
+    command.add_argument("--padding", type=int, default=4096,
+                         help="bytes of filler text per page")
+    command.add_argument("--workers", type=int)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_crawl)
+
+    command = commands.add_parser(
+        "incremental", help="compare cold and warm starts after small edits"
+    )
+    command.add_argument("--pages", type=int, default=100000)
+    command.add_argument("--links", type=int, default=10,
+                         help="most links per page")
+    command.add_argument("--edits", type=float, default=0.001,
+                         help="fraction of pages edited (default: 0.001)")
+    command.add_argument("--cluster-size", type=int, default=100,
+                         help="pages per cluster (default: 100)")
+    command.add_argument("--cross", type=float, default=0.01,
+                         help="fraction of links leaving their cluster "
+                              "(default: 0.01)")
+    command.add_argument("--tolerance", type=float, default=1e-8)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_incremental)
+
+    command = commands.add_parser(
+        "personalized", help="compare forward push with power iteration"
+    )
+    command.add_argument("--pages", type=int, default=100000)
+    command.add_argument("--links", type=int, default=10,
+                         help="most links per page")
+    command.add_argument("--queries", type=int, default=20)
+    command.add_argument("--epsilons", type=float, nargs="+",
+                         default=[1e-3, 1e-4, 1e-5])
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_personalized)
+
+    command = commands.add_parser(
+        "suite", help="run every engine on graphs of several shapes"
+    )
+    command.add_argument("--pages", type=int, default=50000)
+    command.add_argument("--links", type=int, default=5,
+                         help="average links per page")
+    command.add_argument("--shapes", nargs="+", choices=SHAPES,
+                         default=list(SHAPES))
+    command.add_argument("--engines", nargs="+", choices=ENGINES,
+                         default=list(ENGINES))
+    command.add_argument("--tolerance", type=float, default=1e-6)
+    command.add_argument("--samples", type=int, default=10 ** 6)
+    command.add_argument("--workers", type=int)
+    command.add_argument("--legacy-max", type=int, default=2000,
+                         help="largest graph to run legacy-iterate on")
+    command.add_argument("--output", default="benchmark.json",
+                         help="results file (default: benchmark.json)")
+    command.add_argument("--baseline", metavar="FILE",
+                         help="earlier results to compare with")
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=bench_suite)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Parallel, streaming crawler for directories of HTML pages.
+
+Each page is scanned for links in fixed-size chunks, so no page is ever
+held in memory whole, and pages are scanned over a process pool. The
+links found in each page are cached in links.cache inside the crawled
+directory, keyed by the page's size and modification time, so a
+re-crawl only parses pages that changed.
+
+Usage: python crawler.py directory [--workers N] [--no-cache]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from processes import fork_pool
+
+LINKS_FILE = "links.cache"
+LINKS_VERSION = 1
+
+# The href of an <a> tag
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters scanned at a time
+CHUNK_SIZE = 2 ** 16
+
+# Longest unfinished tag carried over from one chunk to the next
+MAX_TAG = 2 ** 12
+
+# Pages below which parsing is not worth starting a process pool
+PARALLEL_PAGES = 256
+
+
+def extract_links(path):
+    """
+    Returns the set of link targets in the HTML file at `path`.
+
+    The file is scanned chunk by chunk. A tag left open at the end of
+    a chunk is carried over to the next, so links split across chunks
+    are still found; an open tag longer than MAX_TAG characters is
+    taken to be a stray '<' in the text and dropped.
+    """
+    links = set()
+    carry = ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            text = carry + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            tag = text.rfind("<", end)
+            if (tag == -1 or text.find(">", tag) != -1
+                    or len(text) - tag > MAX_TAG):
+                carry = ""
+            else:
+                carry = text[tag:]
+    return links
+
+
+def parse_page(task):
+    """
+    Returns (filename, links) for one page; runs inside a worker process.
+    """
+    directory, filename = task
+    links = extract_links(os.path.join(directory, filename))
+    return filename, sorted(links - {filename})
+
+
+def crawl(directory, workers=None, cache=True, stats=None):
+    """
+    Returns the corpus of a directory of HTML pages: a dictionary
+    mapping each page to the set of other pages in the directory it
+    links to.
+
+    Pages are parsed by `workers` processes (all cores by default). If
+    `cache` is true, unchanged pages are read from links.cache and the
+    cache is brought up to date. If `stats` is a dictionary, the number
+    of pages, pages parsed and seconds taken are recorded in it.
+    """
+    start = time.perf_counter()
+    stamps = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html") and entry.is_file():
+                status = entry.stat()
+                stamps[entry.name] = [status.st_size, status.st_mtime_ns]
+
+    cached = read_cache(directory) if cache else {}
+    links = {}
+    stale = []
+    for filename, stamp in stamps.items():
+        entry = cached.get(filename)
+        if entry is not None and entry["stamp"] == stamp:
+            links[filename] = entry["links"]
+        else:
+            stale.append(filename)
+
+    tasks = [(directory, filename) for filename in stale]
+    if workers == 1 or len(tasks) < PARALLEL_PAGES:
+        links.update(map(parse_page, tasks))
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(len(tasks) // (4 * workers), 1)
+        with fork_pool(workers) as pool:
+            links.update(pool.imap_unordered(parse_page, tasks, chunksize))
+
+    if cache and (stale or len(cached) != len(stamps)):
+        write_cache(directory, {
+            filename: {"stamp": stamps[filename], "links": links[filename]}
+            for filename in stamps
+        })
+
+    # Only include links to other pages in the corpus
+    corpus = {
+        filename: {link for link in links[filename] if link in stamps}
+        for filename in stamps
+    }
+    if stats is not None:
+        stats["pages"] = len(corpus)
+        stats["parsed"] = len(stale)
+        stats["seconds"] = time.perf_counter() - start
+    return corpus
+
+
+def read_cache(directory):
+    """
+    Returns the cached links of a directory, or an empty dictionary if
+    there is no usable cache.
+    """
+    try:
+        with open(os.path.join(directory, LINKS_FILE), encoding="utf-8") as f:
+            contents = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if contents.get("version") != LINKS_VERSION:
+        return {}
+    return contents["pages"]
+
+
+def write_cache(directory, pages):
+    """
+    Replaces the links cache of a directory. A directory that cannot be
+    written to is left without a cache.
+    """
+    path = os.path.join(directory, LINKS_FILE)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": LINKS_VERSION, "pages": pages}, f)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a corpus directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int,
+                        help="parsing processes (default: all cores)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="parse every page and leave links.cache alone")
+    args = parser.parse_args()
+
+    stats = {}
+    corpus = crawl(args.directory, args.workers, args.cache, stats)
+    links = sum(map(len, corpus.values()))
+    print(f"Crawled {stats['pages']} pages ({stats['parsed']} parsed), "
+          f"{links} links in {stats['seconds']:.3f}s "
+          f"({stats['pages'] / max(stats['seconds'], 1e-9):.0f} pages/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Binary edge lists and out-of-core PageRank.
+
+An edge list file holds a link graph too large for a corpus dictionary:
+
+    magic, header length, JSON header      padded to HEADER_SIZE bytes
+    edges        int32 (source, destination) pairs, sorted by destination
+    out_degree   int32 number of links of each page
+
+Pages are numbered from 0. Their names, if known, are kept one per line
+in a sidecar file with the extension .pages.
+
+`iterate_edges` runs PageRank on such a file by memory-mapping it and
+streaming the edges in blocks on every iteration, so besides the
+mapped file only two rank vectors are held in memory. Because edges are
+sorted by destination, each block only adds to a contiguous range of
+the new rank vector.
+
+Usage: python edgelist.py export corpus FILE
+       python edgelist.py generate PAGES FILE [--links N] [--dangling F]
+       python edgelist.py rank FILE [--top K] [--block-edges N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from linkgraph import LinkGraph
+from pagerank import DAMPING, MAX_ITERATIONS, TOLERANCE, crawl
+
+EDGES_MAGIC = b"PREDGE\x01\x00"
+HEADER_SIZE = 4096
+INDEX_TYPE = np.int32
+
+# Edges streamed per block
+BLOCK_EDGES = 2 ** 22
+
+# Pages per block when scanning rank vectors
+BLOCK_PAGES = 2 ** 20
+
+
+class EdgeList():
+    """
+    A memory-mapped edge list file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(EDGES_MAGIC)) != EDGES_MAGIC:
+                raise ValueError(f"{path} is not an edge list file")
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+        self.path = path
+        self.n_pages = header["pages"]
+        self.n_edges = header["edges"]
+        self.has_names = header["names"]
+        self.edges = np.memmap(path, dtype=INDEX_TYPE, mode="r",
+                               offset=HEADER_SIZE, shape=(self.n_edges, 2))
+        self.out_degree = np.memmap(
+            path, dtype=INDEX_TYPE, mode="r",
+            offset=HEADER_SIZE + self.edges.nbytes, shape=(self.n_pages,)
+        )
+
+    def __len__(self):
+        return self.n_pages
+
+    def names(self):
+        """
+        Returns the list of page names, or numbers if there are none.
+        """
+        if not self.has_names:
+            return [str(page) for page in range(self.n_pages)]
+        with open(f"{self.path}.pages", encoding="utf-8") as f:
+            return f.read().split("\n")[:self.n_pages]
+
+    def blocks(self, block_edges=BLOCK_EDGES):
+        """
+        Yields (sources, destinations) arrays of consecutive edges.
+        """
+        for start in range(0, self.n_edges, block_edges):
+            block = np.asarray(self.edges[start:start + block_edges])
+            yield block[:, 0], block[:, 1]
+
+
+class EdgeWriter():
+    """
+    Writes an edge list file from blocks of edges given in order of
+    destination.
+    """
+
+    def __init__(self, path, n_pages):
+        self.path = path
+        self.n_pages = n_pages
+        self.n_edges = 0
+        self.out_degree = np.zeros(n_pages, dtype=np.int64)
+        self.temporary = f"{path}.{os.getpid()}.tmp"
+        self.file = open(self.temporary, "wb")
+        self.file.write(bytes(HEADER_SIZE))
+
+    def write(self, sources, destinations):
+        block = np.empty((len(sources), 2), dtype=INDEX_TYPE)
+        block[:, 0] = sources
+        block[:, 1] = destinations
+        self.file.write(block.tobytes())
+        self.out_degree += np.bincount(sources, minlength=self.n_pages)
+        self.n_edges += len(sources)
+
+    def close(self, names=None):
+        """
+        Writes the out-degrees and header, and the page names if given,
+        and moves the file into place.
+        """
+        self.file.write(self.out_degree.astype(INDEX_TYPE).tobytes())
+        header = json.dumps({
+            "pages": self.n_pages,
+            "edges": self.n_edges,
+            "names": names is not None
+        }).encode("utf-8")
+        self.file.seek(0)
+        self.file.write(EDGES_MAGIC)
+        self.file.write(len(header).to_bytes(8, "little"))
+        self.file.write(header)
+        self.file.close()
+        if names is not None:
+            with open(f"{self.path}.pages", "w", encoding="utf-8") as f:
+                f.write("\n".join(names))
+        os.replace(self.temporary, self.path)
+
+
+def export_corpus(corpus, path):
+    """
+    Writes a corpus dictionary as an edge list file.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    order = np.argsort(graph.targets, kind="stable")
+    writer = EdgeWriter(path, len(graph))
+    writer.write(graph.sources[order], graph.targets[order])
+    writer.close(graph.pages)
+
+
+def generate(path, n_pages, links=10, dangling=0.1, seed=None,
+             block_pages=BLOCK_PAGES):
+    """
+    Writes a random graph of `n_pages` pages as an edge list file,
+    a block of destinations at a time. Each page is linked to by
+    `links` pages on average, chosen uniformly among all but the last
+    `dangling` fraction of pages, which have no links.
+    """
+    rng = np.random.default_rng(seed)
+    linking = max(int(n_pages * (1 - dangling)), 1)
+    writer = EdgeWriter(path, n_pages)
+    for start in range(0, n_pages, block_pages):
+        stop = min(start + block_pages, n_pages)
+        in_degree = rng.poisson(links, size=stop - start)
+        destinations = np.repeat(np.arange(start, stop, dtype=np.int64),
+                                 in_degree)
+        sources = rng.integers(linking, size=len(destinations))
+        # Drop self links and repeated links, keeping destination order
+        codes = destinations * n_pages + sources
+        codes.sort()
+        destinations, sources = np.divmod(codes, n_pages)
+        keep = sources != destinations
+        keep[1:] &= codes[1:] != codes[:-1]
+        writer.write(sources[keep], destinations[keep])
+    writer.close()
+
+
+def iterate_edges(edge_list, damping_factor, tolerance=TOLERANCE,
+                  max_iterations=MAX_ITERATIONS, block_edges=BLOCK_EDGES,
+                  stats=None):
+    """
+    Returns the PageRank vector of an EdgeList, streaming its edges in
+    blocks of `block_edges` on every iteration until the L1 norm of the
+    change is below `tolerance` or `max_iterations` steps were taken.
+
+    If `stats` is a dictionary, the number of iterations and the
+    residual of each are recorded in it.
+    """
+    n_pages = len(edge_list)
+    out_degree = edge_list.out_degree
+    ranks = np.full(n_pages, 1 / n_pages)
+    new_ranks = np.zeros(n_pages)
+    residuals = []
+    for _ in range(max_iterations):
+        dangling = sum(
+            ranks[start:start + BLOCK_PAGES][
+                out_degree[start:start + BLOCK_PAGES] == 0
+            ].sum()
+            for start in range(0, n_pages, BLOCK_PAGES)
+        )
+        for sources, destinations in edge_list.blocks(block_edges):
+            low = destinations[0]
+            high = destinations[-1] + 1
+            new_ranks[low:high] += np.bincount(
+                destinations - low, minlength=high - low,
+                weights=ranks[sources] / out_degree[sources]
+            )
+        new_ranks *= damping_factor
+        new_ranks += ((1 - damping_factor)
+                      + damping_factor * dangling) / n_pages
+        residuals.append(float(sum(
+            np.abs(new_ranks[start:start + BLOCK_PAGES]
+                   - ranks[start:start + BLOCK_PAGES]).sum()
+            for start in range(0, n_pages, BLOCK_PAGES)
+        )))
+        ranks, new_ranks = new_ranks, ranks
+        new_ranks.fill(0)
+        if residuals[-1] < tolerance:
+            break
+    if stats is not None:
+        stats["iterations"] = len(residuals)
+        stats["residuals"] = residuals
+    ranks /= ranks.sum()
+    return ranks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary edge list tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("export",
+                                  help="export a corpus directory")
+    command.add_argument("corpus")
+    command.add_argument("file")
+    command = commands.add_parser("generate",
+                                  help="write a random synthetic graph")
+    command.add_argument("pages", type=int)
+    command.add_argument("file")
+    command.add_argument("--links", type=float, default=10,
+                         help="average links to each page (default: 10)")
+    command.add_argument("--dangling", type=float, default=0.1,
+                         help="fraction of pages without links "
+                              "(default: 0.1)")
+    command.add_argument("--seed", type=int)
+    command = commands.add_parser("rank", help="run out-of-core PageRank")
+    command.add_argument("file")
+    command.add_argument("--top", type=int, default=10,
+                         help="number of pages to list (default: 10)")
+    command.add_argument("--tolerance", type=float, default=TOLERANCE)
+    command.add_argument("--block-edges", type=int, default=BLOCK_EDGES)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        export_corpus(crawl(args.corpus), args.file)
+    elif args.command == "generate":
+        generate(args.file, args.pages, args.links, args.dangling, args.seed)
+    if args.command != "rank":
+        edge_list = EdgeList(args.file)
+        print(f"Wrote {len(edge_list)} pages, {edge_list.n_edges} links "
+              f"in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+        return
+
+    edge_list = EdgeList(args.file)
+    stats = {}
+    ranks = iterate_edges(edge_list, DAMPING, args.tolerance,
+                          block_edges=args.block_edges, stats=stats)
+    print(f"Ranked {len(edge_list)} pages in {stats['iterations']} "
+          f"iterations, {time.perf_counter() - start:.3f}s", file=sys.stderr)
+    names = edge_list.names()
+    for page in np.argsort(ranks)[::-1][:args.top]:
+        print(f"  {names[page]}: {ranks[page]:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
-import os
-import random
-import re
 import sys
 
+import crawler
+from linkgraph import LinkGraph, power_iterate, warm_start
+from sampler import parallel_counts
+
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    args = sys.argv[1:]
+    # Keep the links found in links.cache inside the corpus
+    cache = "--cache" in args
+    if cache:
+        args.remove("--cache")
+    if len(args) != 1:
+        sys.exit("Usage: python pagerank.py corpus [--cache]")
+    corpus = crawl(args[0], cache=cache)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -21,31 +29,17 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, workers=None, cache=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
 
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
-
-    return pages
+    Pages are parsed in parallel by `workers` processes. If `cache` is
+    true, links are cached in links.cache inside `directory`, and only
+    pages changed since the last crawl are parsed.
+    """
+    return crawler.crawl(directory, workers, cache)
 
 
 def transition_model(corpus, page, damping_factor):
@@ -73,77 +67,50 @@ def transition_model(corpus, page, damping_factor):
     return prob
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, workers=1, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    Samples are drawn by batches of random surfers walking together,
+    optionally split over `workers` processes; `seed` makes the result
+    reproducible.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    pages = list(corpus.keys())
-    counts = {p: 0 for p in pages}
-    # First sample: random page
-    current = random.choice(pages)
-    counts[current] += 1
-    # Remaining samples
-    for _ in range(1, n):
-        distribution = transition_model(corpus, current, damping_factor)
-        # Choose next based on distribution
-        next_page = random.choices(
-            population=list(distribution.keys()),
-            weights=list(distribution.values()),
-            k=1
-        )[0]
-        counts[next_page] += 1
-        current = next_page
-    # Convert counts to probabilities
-    return {p: counts[p] / n for p in pages}
-
-
-def iterate_pagerank(corpus, damping_factor):
+    if not corpus:
+        return {}
+    graph = LinkGraph.from_corpus(corpus)
+    counts = parallel_counts(graph, damping_factor, n, workers, seed)
+    return graph.to_dict(counts / n)
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     max_iterations=MAX_ITERATIONS, start=None):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until convergence: until the ranks change by less
+    than `tolerance` in total (L1 norm), or after `max_iterations`
+    updates.
+
+    If `start` is a dictionary of ranks from an earlier version of the
+    corpus, iteration starts from those ranks instead of uniform ones,
+    which converges in fewer updates when the corpus changed little.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    pages = list(corpus.keys())
-    n_pages = len(pages)
-    # Initialize ranks
-    ranks = {p: 1 / n_pages for p in pages}
-    # Precompute incoming links (including pages with no outgoing treated specially)
-    incoming = {p: set() for p in pages}
-    for p in pages:
-        if corpus[p]:
-            for q in corpus[p]:
-                incoming[q].add(p)
-        else:
-            # p has no links: treat as linking to all pages
-            for q in pages:
-                incoming[q].add(p)
-    # Iterate until convergence
-    while True:
-        new_ranks = {}
-        for p in pages:
-            # Random jump factor
-            rank = (1 - damping_factor) / n_pages
-            # Summation over incoming links
-            summation = 0
-            for q in incoming[p]:
-                # Outgoing count for q
-                links_q = corpus[q] if corpus[q] else set(pages)
-                summation += ranks[q] / len(links_q)
-            rank += damping_factor * summation
-            new_ranks[p] = rank
-        # Check convergence
-        if all(abs(new_ranks[p] - ranks[p]) < 0.001 for p in pages):
-            break
-        ranks = new_ranks
-    return ranks
+    if not corpus:
+        return {}
+    graph = LinkGraph.from_corpus(corpus)
+    if start is not None:
+        start = warm_start(graph, start)
+    ranks = power_iterate(graph, damping_factor, tolerance, max_iterations,
+                          start)
+    return graph.to_dict(ranks)
 
 
 if __name__ == "__main__":
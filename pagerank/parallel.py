@@ -0,0 +1,242 @@
+"""
+Parallel, block-partitioned PageRank over an edge list file.
+
+Pages are split into contiguous blocks holding about the same number of
+incoming links. On every iteration each worker process computes the new
+ranks of whole blocks from the edge list (sorted by destination, so a
+block's links are one contiguous range of the file) and writes them
+into rank vectors in shared memory; the main process waits for all
+blocks before starting the next iteration.
+
+With Jacobi updates (the default) a block reads the ranks of the last
+iteration and writes the new ones into a second vector. With Gauss-
+Seidel updates there is one vector, updated in place sub-block by
+sub-block, so later sub-blocks already use the new ranks of earlier
+ones; this usually converges in fewer iterations. Which new ranks a
+block sees then depends on the order of the blocks, so Gauss-Seidel
+runs the blocks one after another in a single process, and the ranks
+are the same on every run.
+
+Usage: python parallel.py FILE [--workers N] [--gauss-seidel]
+"""
+import argparse
+import bisect
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from edgelist import BLOCK_EDGES, EdgeList
+from pagerank import DAMPING, MAX_ITERATIONS, TOLERANCE
+from processes import fork_pool
+
+# Blocks per worker, so that fast workers can take over slow ones' work
+BLOCKS_PER_WORKER = 4
+
+# Edges per in-place update with Gauss-Seidel: smaller sub-blocks let
+# more pages see new ranks within an iteration
+GAUSS_SEIDEL_EDGES = 2 ** 16
+
+# Edge list, rank vectors and damping factor of a worker process
+shared = None
+
+
+def partition(destinations, first_page, last_page, first_edge, last_edge,
+              n_blocks):
+    """
+    Splits pages `first_page` up to `last_page`, whose incoming links are
+    edges `first_edge` up to `last_edge`, into at most `n_blocks` ranges
+    of pages with about the same number of links.
+    Returns (first page, last page, first edge, last edge) for each.
+    """
+    cuts = [first_page]
+    for i in range(1, n_blocks):
+        edge = first_edge + (last_edge - first_edge) * i // n_blocks
+        if edge < last_edge:
+            page = int(destinations[edge])
+            if cuts[-1] < page < last_page:
+                cuts.append(page)
+    cuts.append(last_page)
+    # Bisect rather than np.searchsorted, which would copy the strided
+    # column of the memory-mapped edges
+    edges = [first_edge, *(
+        bisect.bisect_left(destinations, page, first_edge, last_edge)
+        for page in cuts[1:-1]
+    ), last_edge]
+    return [(cuts[i], cuts[i + 1], edges[i], edges[i + 1])
+            for i in range(len(cuts) - 1)]
+
+
+def init_worker(path, names, damping_factor):
+    global shared
+    edge_list = EdgeList(path)
+    memories = [shared_memory.SharedMemory(name) for name in names]
+    shared = {
+        "edge_list": edge_list,
+        "memories": memories,
+        "vectors": [np.ndarray(len(edge_list), dtype=np.float64,
+                               buffer=memory.buf) for memory in memories],
+        "damping_factor": damping_factor,
+    }
+
+
+def update_block(task):
+    """
+    Computes the new ranks of one block of pages; runs inside a worker.
+    Returns the L1 change of the block's ranks, and the sums of its new
+    ranks over its dangling pages and over all of its pages.
+    """
+    block, current, jumping, gauss_seidel = task
+    edge_list = shared["edge_list"]
+    damping_factor = shared["damping_factor"]
+    out_degree = edge_list.out_degree
+    destinations = edge_list.edges[:, 1]
+    ranks = shared["vectors"][current]
+    target = ranks if gauss_seidel else shared["vectors"][1 - current]
+
+    first_page, last_page, first_edge, last_edge = block
+    size = GAUSS_SEIDEL_EDGES if gauss_seidel else BLOCK_EDGES
+    n_sub = max((last_edge - first_edge) // size, 1)
+    residual = 0.0
+    dangling = 0.0
+    total = 0.0
+    for low, high, start, stop in partition(destinations, first_page,
+                                            last_page, first_edge,
+                                            last_edge, n_sub):
+        edges = np.asarray(edge_list.edges[start:stop])
+        sources = edges[:, 0]
+        incoming = np.bincount(
+            edges[:, 1] - low, minlength=high - low,
+            weights=ranks[sources] / out_degree[sources]
+        )
+        values = damping_factor * incoming + jumping
+        residual += float(np.abs(values - ranks[low:high]).sum())
+        dangling += float(values[out_degree[low:high] == 0].sum())
+        total += float(values.sum())
+        target[low:high] = values
+    return residual, dangling, total
+
+
+def iterate_parallel(path, damping_factor, tolerance=TOLERANCE,
+                     max_iterations=MAX_ITERATIONS, workers=None,
+                     gauss_seidel=False, stats=None, report=None):
+    """
+    Returns the PageRank vector of the edge list file at `path`, computed
+    by `workers` processes (all cores by default) until the L1 norm of
+    the change is below `tolerance` or `max_iterations` steps were taken.
+
+    If `stats` is a dictionary, the number of iterations and the
+    residual and seconds of each are recorded in it. `report`, if
+    given, is called with the iteration number, residual and seconds
+    after every iteration.
+
+    Gauss-Seidel updates run in one process; raises ValueError if
+    `gauss_seidel` is combined with more than one worker.
+    """
+    global shared
+    if gauss_seidel:
+        if workers is not None and workers > 1:
+            raise ValueError("Gauss-Seidel updates run in one process")
+        workers = 1
+    edge_list = EdgeList(path)
+    n_pages = len(edge_list)
+    workers = workers or os.cpu_count() or 1
+    blocks = partition(edge_list.edges[:, 1], 0, n_pages, 0,
+                       edge_list.n_edges, workers * BLOCKS_PER_WORKER)
+
+    memories = [
+        shared_memory.SharedMemory(create=True, size=max(8 * n_pages, 1))
+        for _ in range(1 if gauss_seidel else 2)
+    ]
+    pool = None
+    try:
+        names = [memory.name for memory in memories]
+        init_worker(path, names, damping_factor)
+        shared["vectors"][0].fill(1 / n_pages)
+        dangling = float((edge_list.out_degree == 0).sum()) / n_pages
+        if workers > 1:
+            pool = fork_pool(workers, init_worker,
+                             (path, names, damping_factor))
+
+        current = 0
+        residuals = []
+        seconds = []
+        for iteration in range(1, max_iterations + 1):
+            start = time.perf_counter()
+            jumping = ((1 - damping_factor)
+                       + damping_factor * dangling) / n_pages
+            tasks = [(block, current, jumping, gauss_seidel)
+                     for block in blocks]
+            if pool is None:
+                results = list(map(update_block, tasks))
+            else:
+                results = pool.map(update_block, tasks, chunksize=1)
+            if not gauss_seidel:
+                current = 1 - current
+            residual = sum(result[0] for result in results)
+            dangling = sum(result[1] for result in results)
+            if gauss_seidel:
+                # In-place updates mix old and new ranks, so the ranks
+                # no longer sum to 1; rescale them before they drift
+                total = sum(result[2] for result in results)
+                shared["vectors"][0] /= total
+                dangling /= total
+            residuals.append(residual)
+            seconds.append(time.perf_counter() - start)
+            if report is not None:
+                report(iteration, residual, seconds[-1])
+            if residual < tolerance:
+                break
+
+        ranks = shared["vectors"][current].copy()
+        if stats is not None:
+            stats["iterations"] = len(residuals)
+            stats["residuals"] = residuals
+            stats["seconds"] = seconds
+        return ranks / ranks.sum()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        shared = None
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel PageRank.")
+    parser.add_argument("file", help="edge list file (see edgelist.py)")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--gauss-seidel", action="store_true",
+                        help="update ranks in place, in one process")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of pages to list (default: 10)")
+    args = parser.parse_args()
+    if args.gauss_seidel and args.workers is not None and args.workers > 1:
+        parser.error("--gauss-seidel runs in one process; "
+                     "it cannot be combined with --workers")
+
+    def report(iteration, residual, seconds):
+        print(f"iteration {iteration:>4}: residual {residual:.3e}, "
+              f"{seconds:.3f}s", file=sys.stderr)
+
+    start = time.perf_counter()
+    stats = {}
+    ranks = iterate_parallel(args.file, DAMPING, args.tolerance,
+                             workers=args.workers,
+                             gauss_seidel=args.gauss_seidel, stats=stats,
+                             report=report)
+    print(f"Ranked in {stats['iterations']} iterations, "
+          f"{time.perf_counter() - start:.3f}s", file=sys.stderr)
+    names = EdgeList(args.file).names()
+    for page in np.argsort(ranks)[::-1][:args.top]:
+        print(f"  {names[page]}: {ranks[page]:.6f}")
+
+
+if __name__ == "__main__":
+    main()
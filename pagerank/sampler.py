@@ -0,0 +1,100 @@
+"""
+Vectorized Monte Carlo PageRank sampler.
+
+Instead of building a transition distribution over all N pages at every
+step, a step of the random surfer is a coin flip and a uniform pick:
+with probability `damping_factor` the surfer follows one of the current
+page's links (looked up in the LinkGraph CSR arrays), otherwise, or if
+the page has no links, it jumps to a page chosen uniformly at random.
+
+Many independent surfers (walkers) take their steps together as NumPy
+array operations. Each walker takes BURN_IN uncounted steps first, so
+that where it started no longer matters. Samples can also be split
+over worker processes with independent random streams, whose visit
+counts are summed.
+"""
+import numpy as np
+
+from processes import fork_pool
+
+# Walkers stepped together per process
+WALKERS = 1024
+
+# Steps each walker takes before its pages are counted
+BURN_IN = 50
+
+# Visits buffered before they are added to the counts
+BUFFER_SIZE = 2 ** 20
+
+# Graph used by worker processes, inherited on fork or pickled on spawn
+shared_graph = None
+
+
+def walk(graph, damping_factor, positions, rng):
+    """
+    Moves each walker at `positions` one step, in place.
+    """
+    n_walkers = len(positions)
+    degree = graph.out_degree[positions]
+    follow = (rng.random(n_walkers) < damping_factor) & (degree > 0)
+    jumping = ~follow
+    positions[jumping] = rng.integers(len(graph), size=int(jumping.sum()))
+    chosen = positions[follow]
+    picks = graph.offsets[chosen] + (
+        rng.random(len(chosen)) * degree[follow]
+    ).astype(np.int64)
+    positions[follow] = graph.targets[picks]
+
+
+def sample_counts(graph, damping_factor, n, seed=None, walkers=WALKERS):
+    """
+    Returns how often each page of a LinkGraph was visited in `n`
+    samples of the random surfer.
+    """
+    rng = np.random.default_rng(seed)
+    n_pages = len(graph)
+    counts = np.zeros(n_pages, dtype=np.int64)
+    walkers = max(min(walkers, n), 1)
+    positions = rng.integers(n_pages, size=walkers)
+    for _ in range(BURN_IN):
+        walk(graph, damping_factor, positions, rng)
+
+    buffer = np.empty(max(BUFFER_SIZE // walkers, 1) * walkers,
+                      dtype=positions.dtype)
+    filled = 0
+    remaining = n
+    while remaining > 0:
+        walk(graph, damping_factor, positions, rng)
+        taken = min(walkers, remaining)
+        buffer[filled:filled + taken] = positions[:taken]
+        filled += taken
+        remaining -= taken
+        if filled == len(buffer) or remaining == 0:
+            counts += np.bincount(buffer[:filled], minlength=n_pages)
+            filled = 0
+    return counts
+
+
+def sample_task(task):
+    n, damping_factor, seed = task
+    return sample_counts(shared_graph, damping_factor, n, seed)
+
+
+def parallel_counts(graph, damping_factor, n, workers, seed=None):
+    """
+    Splits `n` samples over `workers` processes, each with its own
+    random stream spawned from `seed`, and returns the summed counts.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    if workers == 1:
+        return sample_counts(graph, damping_factor, n, seeds[0])
+
+    tasks = [(n // workers + (i < n % workers), damping_factor, seeds[i])
+             for i in range(workers)]
+    with fork_pool(workers, init_worker, (graph,)) as pool:
+        return sum(pool.imap_unordered(sample_task, tasks))
+
+
+def init_worker(graph):
+    global shared_graph
+    shared_graph = graph
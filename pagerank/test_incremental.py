@@ -0,0 +1,62 @@
+"""
+Tests for incremental PageRank.
+
+Usage: python -m unittest test_incremental
+"""
+import unittest
+
+import numpy as np
+
+from benchmark import clustered_corpus
+from incremental import apply_diff, push_update
+from linkgraph import LinkGraph, power_iterate
+from pagerank import DAMPING, MAX_ITERATIONS
+
+TOLERANCE = 1e-6
+
+
+class TestPushUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = clustered_corpus(5000, 10, 100, 0.01, seed=0)
+        self.graph = LinkGraph.from_corpus(self.corpus)
+        self.ranks = power_iterate(self.graph, DAMPING, TOLERANCE,
+                                   MAX_ITERATIONS)
+
+    def check(self, edits):
+        corpus = apply_diff(self.corpus, edits)
+        graph = LinkGraph.from_corpus(corpus)
+        stats = {}
+        ranks = push_update(graph, self.graph, self.ranks, DAMPING,
+                            TOLERANCE, stats=stats)
+        cold_stats = {}
+        cold = power_iterate(graph, DAMPING, TOLERANCE, MAX_ITERATIONS,
+                             stats=cold_stats)
+        self.assertFalse(stats["spread"])
+        # Far fewer links pushed along than power iteration sweeps
+        self.assertLess(stats["pushed_links"], cold_stats["iterations"]
+                        * graph.sources.size / 4)
+        self.assertAlmostEqual(ranks.sum(), 1)
+        self.assertLess(np.abs(ranks - cold).sum(), 10 * TOLERANCE)
+
+    def test_added_links(self):
+        self.check([("+", "10.html", "20.html"),
+                    ("+", "10.html", "30.html"),
+                    ("-", "11.html", min(self.corpus["11.html"]))])
+
+    def test_added_and_removed_pages(self):
+        self.check([("-", "50.html", None),
+                    ("+", "new.html", None),
+                    ("+", "new.html", "60.html"),
+                    ("+", "61.html", "new.html")])
+
+    def test_unchanged(self):
+        stats = {}
+        ranks = push_update(self.graph, self.graph, self.ranks, DAMPING,
+                            TOLERANCE, stats=stats)
+        self.assertEqual(stats["pushes"], 0)
+        self.assertLess(np.abs(ranks - self.ranks).sum(), 1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Tests for the parallel PageRank engine.
+
+Usage: python -m unittest test_parallel
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import edgelist
+from pagerank import DAMPING
+from parallel import iterate_parallel
+
+
+class TestGaussSeidel(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "graph.edges")
+        # Enough edges for several Gauss-Seidel sub-blocks
+        edgelist.generate(self.path, 50000, links=8, seed=0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_same_ranks_every_run(self):
+        first = iterate_parallel(self.path, DAMPING, gauss_seidel=True)
+        second = iterate_parallel(self.path, DAMPING, gauss_seidel=True)
+        self.assertTrue(np.array_equal(first, second))
+
+    def test_close_to_jacobi(self):
+        jacobi = iterate_parallel(self.path, DAMPING, workers=2)
+        gauss_seidel = iterate_parallel(self.path, DAMPING,
+                                        gauss_seidel=True)
+        self.assertLess(np.abs(jacobi - gauss_seidel).sum(), 1e-3)
+
+    def test_rejects_several_workers(self):
+        with self.assertRaises(ValueError):
+            iterate_parallel(self.path, DAMPING, workers=2,
+                             gauss_seidel=True)
+
+
+if __name__ == "__main__":
+    unittest.main()